@@ -1,7 +1,41 @@
-from typing import List, Dict, DefaultDict
-from collections import defaultdict
+from typing import List, Dict
 from agents.types import ThreatFinding
 
+# Bit flags for the agents and threat types the correlation patterns look for
+EMAIL_AGENT = 1 << 0
+IP_AGENT = 1 << 1
+LOG_AGENT = 1 << 2
+AGENT_BITS = {
+    "EmailVerificationAgent": EMAIL_AGENT,
+    "IPRangeAnalyzerAgent": IP_AGENT,
+    "LogAnalysisAgent": LOG_AGENT,
+}
+
+BRUTE_FORCE = 1 << 0
+SQL_INJECTION = 1 << 1
+XSS_ATTACK = 1 << 2
+THREAT_BITS = {
+    "BRUTE_FORCE": BRUTE_FORCE,
+    "SQL_INJECTION": SQL_INJECTION,
+    "XSS_ATTACK": XSS_ATTACK,
+}
+
+# Correlation patterns in priority order; the first one an IP group satisfies
+# replaces its individual findings. Each entry is (required agent bits,
+# required threat bits, threat bits of which at least one must be present,
+# attack, severity, description template).
+CORRELATION_PATTERNS = (
+    # Multi-Vector Attack (Email + Log)
+    (EMAIL_AGENT | LOG_AGENT, 0, 0, "MULTI_VECTOR_CAMPAIGN", "CRITICAL",
+     "IP {ip} linked to both Phishing Email and suspicious Log activity."),
+    # Targeted Exploitation (IP Scan + Log)
+    (IP_AGENT | LOG_AGENT, 0, 0, "TARGETED_EXPLOITATION", "CRITICAL",
+     "IP {ip} showed vulnerabilities in scan and now active exploit in logs."),
+    # Brute Force leading to Injection
+    (0, BRUTE_FORCE, SQL_INJECTION | XSS_ATTACK, "ADVANCED_PERSISTENT_THREAT", "CRITICAL",
+     "IP {ip} exhibited brute force followed by injection attempts."),
+)
+
 class CorrelationAgent:
     """
     Correlates multiple threat findings by Source IP and other metadata 
@@ -11,11 +45,17 @@ class CorrelationAgent:
     def correlate(self, findings: List[ThreatFinding]) -> List[Dict]:
         correlated_events = []
         
-        # Group findings by source IP
-        ip_groups: DefaultDict[str, List[ThreatFinding]] = defaultdict(list)
+        # Group findings by source IP in a single pass, folding each group's
+        # agents and threat types into bitmasks as we go
+        ip_groups: Dict[str, list] = {}
         for f in findings:
             if f.source_ip and f.source_ip != "Unknown":
-                ip_groups[f.source_ip].append(f)
+                group = ip_groups.get(f.source_ip)
+                if group is None:
+                    group = ip_groups[f.source_ip] = [[], 0, 0]
+                group[0].append(f)
+                group[1] |= AGENT_BITS.get(f.agent_name, 0)
+                group[2] |= THREAT_BITS.get(f.threat_type, 0)
             else:
                 # If IP is unknown, track it separately
                 correlated_events.append({
@@ -26,37 +66,19 @@ class CorrelationAgent:
                     "description": f.description
                 })
 
-        for ip, ip_findings in ip_groups.items():
-            threat_types = set(f.threat_type for f in ip_findings)
-            agent_names = set(f.agent_name for f in ip_findings)
-            
-            # Pattern 1: Multi-Vector Attack (Email + Log)
-            if "EmailVerificationAgent" in agent_names and "LogAnalysisAgent" in agent_names:
-                correlated_events.append({
-                    "attack": "MULTI_VECTOR_CAMPAIGN",
-                    "severity": "CRITICAL",
-                    "source": ip,
-                    "description": f"IP {ip} linked to both Phishing Email and suspicious Log activity."
-                })
-            
-            # Pattern 2: Targeted Exploitation (IP Scan + Log)
-            elif "IPRangeAnalyzerAgent" in agent_names and "LogAnalysisAgent" in agent_names:
-                correlated_events.append({
-                    "attack": "TARGETED_EXPLOITATION",
-                    "severity": "CRITICAL",
-                    "source": ip,
-                    "description": f"IP {ip} showed vulnerabilities in scan and now active exploit in logs."
-                })
+        for ip, (ip_findings, agent_mask, threat_mask) in ip_groups.items():
+            for need_agents, need_threats, any_threats, attack, severity, template in CORRELATION_PATTERNS:
+                if (agent_mask & need_agents == need_agents
+                        and threat_mask & need_threats == need_threats
+                        and (not any_threats or threat_mask & any_threats)):
+                    correlated_events.append({
+                        "attack": attack,
+                        "severity": severity,
+                        "source": ip,
+                        "description": template.format(ip=ip)
+                    })
+                    break
 
-            # Pattern 3: Brute Force leading to Injection
-            elif "BRUTE_FORCE" in threat_types and ("SQL_INJECTION" in threat_types or "XSS_ATTACK" in threat_types):
-                correlated_events.append({
-                    "attack": "ADVANCED_PERSISTENT_THREAT",
-                    "severity": "CRITICAL",
-                    "source": ip,
-                    "description": f"IP {ip} exhibited brute force followed by injection attempts."
-                })
-            
             # Pass through individual findings
             else:
                 for f in ip_findings:
@@ -1,22 +1,16 @@
 import re
-import os
-import json
-import asyncio
 from typing import List, Dict, Optional
-import google.generativeai as genai
+from agents import llm_client
 from agents.base_agent import BaseAgent
 from agents.types import ThreatFinding
 
+# Phrases the no-API-key fallback treats as phishing urgency cues
+URGENCY_PHRASES = ("urgent", "password reset", "verify your account", "suspicious activity")
+
 class EmailVerificationAgent(BaseAgent):
     def __init__(self):
         super().__init__(name="EmailVerificationAgent")
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if api_key and api_key != "your_api_key_here":
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            self.has_api_key = True
-        else:
-            self.has_api_key = False
+        self.has_api_key = llm_client.has_api_key
         
         self.url_pattern = re.compile(r'https?://[^\s<>"]+|www\.[^\s<>"]+')
 
@@ -32,7 +26,8 @@ class EmailVerificationAgent(BaseAgent):
             findings.extend(semantic_findings)
         else:
             # Fallback to basic heuristics if no API key
-            if any(p in email_content.lower() for p in ["urgent", "password reset", "verify your account", "suspicious activity"]):
+            content_lower = email_content.lower()
+            if any(p in content_lower for p in URGENCY_PHRASES):
                 findings.append(ThreatFinding(
                     agent_name=self.name,
                     threat_type="PHISHING_ATTEMPT",
@@ -65,13 +60,11 @@ class EmailVerificationAgent(BaseAgent):
         """
         
         try:
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
-            text = response.text.strip()
-            if text.startswith("```json"): text = text[7:-3].strip()
-            elif text.startswith("```"): text = text[3:-3].strip()
-            
-            raw_findings = json.loads(text)
-            return [ThreatFinding(agent_name=self.name, **f) for f in raw_findings]
+            # Replies that do not parse into findings raise and are not cached
+            return await llm_client.generate_text(prompt, parse=self._parse_findings)
         except Exception as e:
             print(f"Error in Email Semantic Analysis: {e}")
             return []
+
+    def _parse_findings(self, text: str) -> List[ThreatFinding]:
+        return [ThreatFinding(agent_name=self.name, **f) for f in llm_client.parse_json(text)]
@@ -1,21 +1,12 @@
-import os
-import json
-import asyncio
 from typing import List, Dict, Optional
-import google.generativeai as genai
+from agents import llm_client
 from agents.base_agent import BaseAgent
 from agents.types import ThreatFinding
 
 class IPRangeAnalyzerAgent(BaseAgent):
     def __init__(self):
         super().__init__(name="IPRangeAnalyzerAgent")
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if api_key and api_key != "your_api_key_here":
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            self.has_api_key = True
-        else:
-            self.has_api_key = False
+        self.has_api_key = llm_client.has_api_key
 
     async def analyze(self, ip_data: str) -> List[ThreatFinding]:
         """
@@ -61,13 +52,11 @@ class IPRangeAnalyzerAgent(BaseAgent):
         """
         
         try:
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
-            text = response.text.strip()
-            if text.startswith("```json"): text = text[7:-3].strip()
-            elif text.startswith("```"): text = text[3:-3].strip()
-            
-            raw_findings = json.loads(text)
-            return [ThreatFinding(agent_name=self.name, **f) for f in raw_findings]
+            # Replies that do not parse into findings raise and are not cached
+            return await llm_client.generate_text(prompt, parse=self._parse_findings)
         except Exception as e:
             print(f"Error in IP Vulnerability Analysis: {e}")
             return []
+
+    def _parse_findings(self, text: str) -> List[ThreatFinding]:
+        return [ThreatFinding(agent_name=self.name, **f) for f in llm_client.parse_json(text)]
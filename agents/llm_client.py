@@ -0,0 +1,116 @@
+"""
+Shared Gemini client for the LLM-backed agents.
+
+The API key is read once at import and the model is constructed on first
+use, once per process, so every agent reuses the same configured client and
+its connection pool. Responses that parse are cached by prompt, so replayed
+inputs and duplicate alerts do not cost another round-trip.
+"""
+
+import os
+import re
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import orjson
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL_NAME = 'gemini-1.5-flash'
+
+_api_key = os.getenv("GOOGLE_API_KEY")
+has_api_key = bool(_api_key and _api_key != "your_api_key_here")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Returns the shared GenerativeModel, configuring the client on first call."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                genai.configure(api_key=_api_key)
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+
+# A response wrapped in a markdown code fence, optionally tagged as json
+_FENCE = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*```\s*$', re.DOTALL)
+
+# LRU cache of validated response text, keyed by a 16-byte BLAKE2b digest
+# of the prompt
+max_cache_size = 4096
+_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+# Gemini calls still running, so concurrent misses on one prompt share a call
+_inflight: "Dict[bytes, asyncio.Future]" = {}
+
+
+async def generate_text(prompt: str, parse: Optional[Callable[[str], Any]] = None) -> Any:
+    """
+    Returns the model's response for a prompt, run through ``parse`` if given.
+
+    Identical prompts are answered from the cache; only misses reach Gemini,
+    and concurrent misses on the same prompt wait for one shared call. A
+    response is cached only once ``parse`` accepts it, so a truncated or
+    malformed reply raises here and the prompt is retried on the next call.
+    The cache holds the text and hits parse it again, so every caller gets
+    its own objects. Failed calls raise and are not cached.
+    """
+    if parse is None:
+        parse = _identity
+    key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+    text = _cache.get(key)
+    if text is not None:
+        _cache.move_to_end(key)
+        return parse(text)
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        return parse(await asyncio.shield(pending))
+
+    pending = _inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        response = await get_model().generate_content_async(prompt)
+        # .text raises for an empty or blocked candidate
+        text = response.text
+        result = parse(text)
+    except Exception as e:
+        pending.set_exception(e)
+        # Nobody may be waiting; mark the exception as retrieved
+        pending.exception()
+        raise
+    except BaseException:
+        # Cancelling this caller must not cancel the others sharing the call
+        pending.set_exception(RuntimeError("Shared Gemini call was cancelled"))
+        pending.exception()
+        raise
+    finally:
+        del _inflight[key]
+
+    _cache[key] = text
+    if len(_cache) > max_cache_size:
+        _cache.popitem(last=False)
+    pending.set_result(text)
+    return result
+
+
+def _identity(text: str) -> str:
+    return text
+
+
+def strip_fence(text: str) -> str:
+    """Returns response text without the markdown fence models sometimes add around JSON."""
+    m = _FENCE.match(text)
+    return m.group(1) if m else text.strip()
+
+
+def parse_json(text: str) -> Any:
+    """Parses response text as JSON, ignoring a surrounding markdown fence."""
+    return orjson.loads(strip_fence(text))
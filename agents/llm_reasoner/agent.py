@@ -1,21 +1,48 @@
-import os
-import json
-import asyncio
-from typing import List, Dict
-import google.generativeai as genai
-from dotenv import load_dotenv
+import orjson
+from typing import Callable, List, Dict
+from agents import llm_client
 
-load_dotenv()
+
+# Mock responses used when the Gemini API is unavailable, dispatched on the
+# correlated attack type. Each call builds a fresh decision dict.
+def _immediate_lockdown(finding: Dict) -> Dict:
+    return {
+        "decision": "IMMEDIATE_LOCKDOWN",
+        "severity": "CRITICAL",
+        "actions": ["Disable affected account", "Force password reset", "Block attacker IP"],
+        "reason": "Correlated brute-force and high-risk injection attempts detected"
+    }
+
+
+def _database_isolation(finding: Dict) -> Dict:
+    return {
+        "decision": "DATABASE_ISOLATION",
+        "severity": "CRITICAL",
+        "actions": ["Kill active DB sessions", "Reset database credentials", "Lock down database subnet"],
+        "reason": "High-severity SQL injection attempts detected"
+    }
+
+
+def _perimeter_reinforcement(finding: Dict) -> Dict:
+    return {
+        "decision": "PERIMETER_REINFORCEMENT",
+        "severity": "MEDIUM",
+        "actions": ["Update WAF rules", "Patch affected application components"],
+        "reason": f"Detected {finding.get('attack')} pattern requiring mitigation"
+    }
+
+
+_MOCK_HANDLERS: Dict[str, Callable[[Dict], Dict]] = {
+    "ACCOUNT_COMPROMISE": _immediate_lockdown,
+    "ADVANCED_PERSISTENT_THREAT": _immediate_lockdown,
+    "DATABASE_ATTACK": _database_isolation,
+    "SQL_INJECTION": _database_isolation,
+}
 
 class LLMReasoningAgent:
     def __init__(self):
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if api_key and api_key != "your_api_key_here":
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            self.has_api_key = True
-        else:
-            self.has_api_key = False
+        self.has_api_key = llm_client.has_api_key
+        if not self.has_api_key:
             print("WARNING: Gemini API Key not found or invalid in .env. Falling back to mock reasoning.")
 
     async def reason(self, correlated_findings: List[Dict]) -> List[Dict]:
@@ -30,7 +57,7 @@ class LLMReasoningAgent:
         Task: Analyze correlated attack patterns and provide strategic mitigation protocols.
         
         Input Data (Correlated Attacks):
-        {json.dumps(correlated_findings, indent=2)}
+        {orjson.dumps(correlated_findings).decode()}
 
         Requirement:
         Provide a JSON list of response objects. Each object must strictly follow this schema:
@@ -44,45 +71,15 @@ class LLMReasoningAgent:
         """
 
         try:
-            # Run LLM call in a thread to avoid blocking if using older sync SDK, 
-            # though gemini-1.5 supports async in newer versions.
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
-            
-            # Clean response text in case LLM added markdown backticks
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:-3].strip()
-            elif text.startswith("```"):
-                text = text[3:-3].strip()
-            
-            return json.loads(text)
+            # parse_json drops markdown backticks the LLM may add; replies
+            # that are not JSON raise and are not cached
+            return await llm_client.generate_text(prompt, parse=llm_client.parse_json)
         except Exception as e:
             print(f"Error calling Gemini API: {e}. Falling back to mock.")
             return self._mock_reason(correlated_findings)
 
     def _mock_reason(self, correlated_findings: List[Dict]) -> List[Dict]:
-        decisions = []
-        for finding in correlated_findings:
-            attack = finding.get("attack")
-            if attack in ["ACCOUNT_COMPROMISE", "ADVANCED_PERSISTENT_THREAT"]:
-                decisions.append({
-                    "decision": "IMMEDIATE_LOCKDOWN",
-                    "severity": "CRITICAL",
-                    "actions": ["Disable affected account", "Force password reset", "Block attacker IP"],
-                    "reason": "Correlated brute-force and high-risk injection attempts detected"
-                })
-            elif attack in ["DATABASE_ATTACK", "SQL_INJECTION"]:
-                decisions.append({
-                    "decision": "DATABASE_ISOLATION",
-                    "severity": "CRITICAL",
-                    "actions": ["Kill active DB sessions", "Reset database credentials", "Lock down database subnet"],
-                    "reason": "High-severity SQL injection attempts detected"
-                })
-            else:
-                decisions.append({
-                    "decision": "PERIMETER_REINFORCEMENT",
-                    "severity": "MEDIUM",
-                    "actions": ["Update WAF rules", "Patch affected application components"],
-                    "reason": f"Detected {attack} pattern requiring mitigation"
-                })
-        return decisions
+        return [
+            _MOCK_HANDLERS.get(finding.get("attack"), _perimeter_reinforcement)(finding)
+            for finding in correlated_findings
+        ]
@@ -1,111 +1,252 @@
+import os
 import re
-from typing import List
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from multiprocessing import get_context
+from typing import AsyncIterable, AsyncIterator, List, Tuple
 from agents.base_agent import BaseAgent
-from agents.types import ThreatFinding
+from agents.types import ThreatFinding, intern_ip
+
+__all__ = ['LogAnalysisAgent', 'THREAT_RULES', 'iter_line_blocks', 'shutdown_scan_pool']
+
+# Detection rules: (threat_type, severity, description, keywords, keyword pairs).
+# A rule fires on a line when any keyword occurs, or when both halves of any
+# pair occur. Keywords are lowercase and matched against the lowercased line.
+THREAT_RULES = (
+    ("BRUTE_FORCE", "HIGH", "Repeated authentication failures detected",
+     ("authentication failure", "failed password", "unauthorized access", "access denied"), ()),
+    ("SQL_INJECTION", "CRITICAL", "SQL injection pattern in WAF/Application logs",
+     ("sql injection", "select", "union select", "insert into", "drop table", "or 1=1"), ()),
+    ("XSS_ATTACK", "HIGH", "Cross-site scripting attempt blocked",
+     ("xss attempt", "<script>", "javascript:", "onerror="), ()),
+    ("NETWORK_RECON", "MEDIUM", "Abnormal connection patterns or port scanning",
+     ("port scan", "nmap", "masscan"), (("firewall", "spt="),)),
+    ("PATH_TRAVERSAL", "HIGH", "Attempt to access sensitive files via path traversal",
+     ("../", "/etc/passwd", "/windows/system32", "boot.ini", "/etc/shadow"), ()),
+    ("COMMAND_INJECTION", "CRITICAL", "Potential OS command injection or suspicious process execution detected",
+     ("; cat ", "; ls ", "&& id", "|| whoami", "curl http", "wget http", "reverse_shell", "/tmp/"), ()),
+    ("DATA_EXFILTRATION", "HIGH", "Suspicious data transfer or network connection detected",
+     ("large outbound", "gb", "mb", "tor exit", "base64", "openssl enc"), ()),
+    ("RECON_TOOL", "MEDIUM", "Automated security scanner detected",
+     ("sqlmap", "nikto", "dirbuster", "gobuster", "metasploit"), ()),
+    ("BRUTE_FORCE", "HIGH", "Service-specific authentication failure (SSH/FTP)",
+     (), (("ssh", "failed"), ("ftp", "530"))),
+)
+
+
+# Size of the line blocks stream_analyze scans at a time
+STREAM_BLOCK_SIZE = 1 << 20
+
+
+async def iter_line_blocks(source: AsyncIterable[bytes], block_size: int = STREAM_BLOCK_SIZE) -> AsyncIterator[str]:
+    """
+    Re-chunks a byte stream into decoded blocks of whole lines.
+
+    Chunks are buffered until at least ``block_size`` bytes are pending, then
+    everything up to the last newline is decoded and yielded; the trailing
+    partial line is carried into the next block. Splitting on newline bytes
+    never cuts a UTF-8 sequence in half.
+    """
+    pending = bytearray()
+    async for chunk in source:
+        pending += chunk
+        if len(pending) < block_size:
+            continue
+        cut = pending.rfind(b'\n')
+        if cut < 0:
+            continue
+        yield pending[:cut].decode('utf-8', errors='ignore')
+        del pending[:cut + 1]
+    if pending:
+        yield pending.decode('utf-8', errors='ignore')
+
+
+def _build_matcher(rules):
+    """
+    Compiles every rule keyword into a single matcher for lowercased text.
+
+    Alternatives are ordered longest first, so a match reports the longest
+    keyword starting at that position; ``implied`` maps it to itself plus the
+    shorter keywords that are a prefix of it. ``keyword_rules`` maps a keyword
+    to the indices of the rules it fires, so dispatch is one dict lookup. The
+    pattern deliberately has no capture groups (named or not), which would
+    disable the engine's first-character prefilter.
+    """
+    terms = sorted(
+        {t for rule in rules for t in chain(rule[3], *rule[4])},
+        key=len,
+        reverse=True,
+    )
+    implied = {
+        term: frozenset(other for other in terms if term.startswith(other))
+        for term in terms
+    }
+    keyword_rules = {}
+    for idx, rule in enumerate(rules):
+        for keyword in rule[3]:
+            keyword_rules.setdefault(keyword, set()).add(idx)
+    keyword_rules = {k: frozenset(v) for k, v in keyword_rules.items()}
+    pair_rules = tuple((idx, rule[4]) for idx, rule in enumerate(rules) if rule[4])
+    matcher = re.compile("|".join(re.escape(t) for t in terms))
+    return matcher, implied, keyword_rules, pair_rules
+
+
+_MATCHER, _IMPLIED, _KEYWORD_RULES, _PAIR_RULES = _build_matcher(THREAT_RULES)
+
+IP_PATTERN = re.compile(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})')
+
+# Inputs with at least this many lines are scanned across a process pool.
+# The pool belongs to each server process: under gunicorn every worker
+# starts its own on its first large input, and each scanner is a fresh
+# interpreter that re-imports the agent stack, so the default size splits
+# the CPUs between the WEB_CONCURRENCY workers (SCAN_WORKERS overrides it;
+# 1 turns the pool off).
+PARALLEL_MIN_LINES = 10_000
+
+# Most scanner processes, so a large upload leaves cores for the server
+MAX_SCAN_WORKERS = 4
+
+_pool = None
+
+
+def _scan_workers() -> int:
+    configured = os.getenv("SCAN_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    web_workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return max(1, min((os.cpu_count() or 1) // web_workers, MAX_SCAN_WORKERS))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Returns the scanner process pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked: the server process runs uvicorn,
+        # watchdog and capture threads whose held locks a fork would copy
+        _pool = ProcessPoolExecutor(max_workers=_scan_workers(), mp_context=get_context("spawn"))
+    return _pool
+
+
+def shutdown_scan_pool():
+    """Stops the scanner process pool, if it was started."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _split_lines(logs: str, parts: int) -> List[str]:
+    """Splits text into about ``parts`` contiguous slices, cutting only at newlines."""
+    step = len(logs) // parts + 1
+    slices = []
+    start = 0
+    while start < len(logs):
+        cut = logs.find('\n', start + step)
+        if cut < 0:
+            slices.append(logs[start:])
+            break
+        slices.append(logs[start:cut])
+        start = cut + 1
+    return slices
+
+
+def _scan_logs(logs: str) -> List[Tuple[int, str]]:
+    """
+    Returns one ``(rule index, source ip)`` pair per finding, in line order.
+
+    The scan only produces these compact tuples; ``analyze`` builds the
+    ``ThreatFinding`` objects afterwards. IPs go through ``intern_ip``, so
+    each distinct address is a single string object however many lines it
+    appears on. Lives at module level so process pool workers can run it.
+    """
+    raw = []
+    keyword_rules = _KEYWORD_RULES
+    implied = _IMPLIED
+    search = _MATCHER.search
+
+    # Scan the whole lowercased buffer in one pass, grouping keyword hits
+    # by the offset of the line they fall on. Lines without any hit are
+    # never touched at the Python level.
+    lowered = logs.lower()
+    line_hits = {}
+    m = search(lowered)
+    while m:
+        pos = m.start()
+        line_start = lowered.rfind('\n', 0, pos) + 1
+        hits = line_hits.get(line_start)
+        if hits is None:
+            hits = line_hits[line_start] = set()
+        hits |= implied[m.group()]
+        # Resuming at pos + 1 keeps keywords that overlap a previous hit
+        m = search(lowered, pos + 1)
+
+    for line_start, hits in line_hits.items():
+        fired = set()
+        for keyword in hits:
+            if keyword in keyword_rules:
+                fired |= keyword_rules[keyword]
+        for idx, pairs in _PAIR_RULES:
+            if any(a in hits and b in hits for a, b in pairs):
+                fired.add(idx)
+        if not fired: continue
+
+        # Only lines that produced a finding pay for the IP lookup, which
+        # runs in place on the buffer rather than on a copied line slice.
+        # Lowercasing never changes digits or dots, so the IP is the same.
+        line_end = lowered.find('\n', line_start)
+        if line_end < 0:
+            line_end = len(lowered)
+        ip_match = IP_PATTERN.search(lowered, line_start, line_end)
+        if ip_match:
+            ip = intern_ip(ip_match.group(1))
+        else:
+            ip = "Unknown"
+
+        for idx in sorted(fired):
+            raw.append((idx, ip))
+
+    return raw
+
 
 class LogAnalysisAgent(BaseAgent):
     def __init__(self):
         super().__init__(name="LogAnalysisAgent")
-        self.ip_pattern = re.compile(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})')
 
     async def analyze(self, logs: str) -> List[ThreatFinding]:
-        findings = []
-        lines = logs.split('\n')
-        
-        for line in lines:
-            if not line.strip(): continue
-            
-            ip_match = self.ip_pattern.search(line)
-            ip = ip_match.group(1) if ip_match else "Unknown"
-
-            # Check for authentication failures
-            if any(p in line.lower() for p in ["authentication failure", "failed password", "unauthorized access", "access denied"]):
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="BRUTE_FORCE",
-                    description="Repeated authentication failures detected",
-                    severity="HIGH",
-                    source_ip=ip
-                ))
-            
-            # Check for SQL injection
-            if any(p in line.upper() for p in ["SQL INJECTION", "SELECT", "UNION SELECT", "INSERT INTO", "DROP TABLE", "OR 1=1"]):
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="SQL_INJECTION",
-                    description="SQL injection pattern in WAF/Application logs",
-                    severity="CRITICAL",
-                    source_ip=ip
-                ))
-
-            # Check for XSS
-            if any(p in line.lower() for p in ["xss attempt", "<script>", "javascript:", "onerror="]):
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="XSS_ATTACK",
-                    description="Cross-site scripting attempt blocked",
-                    severity="HIGH",
-                    source_ip=ip
-                ))
-            
-            # Check for network reconnaissance
-            if any(p in line.lower() for p in ["port scan", "nmap", "masscan"]) or ("firewall" in line.lower() and "spt=" in line.lower()):
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="NETWORK_RECON",
-                    description="Abnormal connection patterns or port scanning",
-                    severity="MEDIUM",
-                    source_ip=ip
-                ))
-
-            # Check for Path Traversal
-            if any(p in line.lower() for p in ["../", "/etc/passwd", "/windows/system32", "boot.ini", "/etc/shadow"]):
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="PATH_TRAVERSAL",
-                    description="Attempt to access sensitive files via path traversal",
-                    severity="HIGH",
-                    source_ip=ip
-                ))
-
-            # Check for Command Injection / Reverse Shell
-            if any(p in line.lower() for p in ["; cat ", "; ls ", "&& id", "|| whoami", "curl http", "wget http", "reverse_shell", "/tmp/"]):
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="COMMAND_INJECTION",
-                    description="Potential OS command injection or suspicious process execution detected",
-                    severity="CRITICAL",
-                    source_ip=ip
-                ))
-
-            # Check for Data Exfiltration / Unusual Network
-            if any(p in line.lower() for p in ["large outbound", "gb", "mb", "tor exit", "base64", "openssl enc"]):
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="DATA_EXFILTRATION",
-                    description="Suspicious data transfer or network connection detected",
-                    severity="HIGH",
-                    source_ip=ip
-                ))
-
-            # Check for suspicious User Agents / Scanners (Existing)
-            if any(p in line.lower() for p in ["sqlmap", "nikto", "dirbuster", "gobuster", "metasploit"]):
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="RECON_TOOL",
-                    description=f"Automated security scanner detected",
-                    severity="MEDIUM",
-                    source_ip=ip
-                ))
-
-            # Check for SSH/FTP Brute Force
-            if "ssh" in line.lower() and "failed" in line.lower() or "ftp" in line.lower() and "530" in line.lower():
-                findings.append(ThreatFinding(
-                    agent_name=self.name,
-                    threat_type="BRUTE_FORCE",
-                    description="Service-specific authentication failure (SSH/FTP)",
-                    severity="HIGH",
-                    source_ip=ip
-                ))
-
-        return findings
\ No newline at end of file
+        workers = _scan_workers()
+        if workers > 1 and logs.count('\n') >= PARALLEL_MIN_LINES:
+            # Lines are independent, so large inputs are split at line
+            # boundaries and scanned in parallel, sidestepping the GIL
+            loop = asyncio.get_running_loop()
+            pool = _get_pool()
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(pool, _scan_logs, part)
+                for part in _split_lines(logs, workers)
+            ))
+            raw = chain.from_iterable(parts)
+        else:
+            raw = _scan_logs(logs)
+
+        rules = THREAT_RULES
+        return [
+            ThreatFinding(
+                agent_name=self.name,
+                threat_type=rules[idx][0],
+                description=rules[idx][2],
+                severity=rules[idx][1],
+                source_ip=ip
+            )
+            for idx, ip in raw
+        ]
+
+    async def stream_analyze(self, source: AsyncIterable[bytes]) -> AsyncIterator[ThreatFinding]:
+        """
+        Analyzes a log byte stream without holding all of it in memory.
+
+        Findings are yielded as soon as the block of lines they came from has
+        been scanned, so consumers can start before the stream ends.
+        """
+        async for block in iter_line_blocks(source):
+            for finding in await self.analyze(block):
+                yield finding
@@ -1,14 +1,44 @@
+import sys
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Optional
 
-@dataclass
+__all__ = ['ThreatFinding', 'intern_ip']
+
+
+@lru_cache(maxsize=1 << 16)
+def intern_ip(ip: str) -> str:
+    """
+    Returns the canonical string object for an IP address.
+
+    Every agent routes source IPs through here, so the same address is one
+    shared string wherever it appears and hashes from its cached value when
+    used as a dict key.
+    """
+    return sys.intern(ip)
+
+@dataclass(slots=True, frozen=True)
 class ThreatFinding:
     agent_name: str
     threat_type: str
     description: str
     severity: str = "MEDIUM"
     source_ip: Optional[str] = "Unknown"
-    metadata: dict = field(default_factory=dict)
+    # A private copy of the caller's dict; left out of hashing and equality
+    # so findings stay hashable, and kept a plain dict so they pickle
+    metadata: Dict = field(default_factory=dict, hash=False, compare=False)
+
+    def __post_init__(self):
+        # agent_name, threat_type and severity come from small fixed sets;
+        # interning them shares one string object across all findings.
+        for name in ("agent_name", "threat_type", "severity"):
+            value = getattr(self, name)
+            if isinstance(value, str):
+                object.__setattr__(self, name, sys.intern(value))
+        if isinstance(self.source_ip, str):
+            object.__setattr__(self, "source_ip", intern_ip(self.source_ip))
+        if isinstance(self.metadata, dict):
+            object.__setattr__(self, "metadata", dict(self.metadata))
 
     def __str__(self):
         return f"[{self.severity}] {self.agent_name} -> {self.threat_type} ({self.source_ip}): {self.description}"
@@ -1,7 +1,9 @@
+import os
+import time
 import random
 import asyncio
-import httpx
-from datetime import datetime
+from collections import deque
+from api.pipeline import process_logs
 
 LOG_SAMPLES = [
     '{timestamp} [AUTH] pam_unix(sshd:auth): authentication failure; logname= uid=0 euid=0 tty=ssh ruser= rhost={ip}  user=admin',
@@ -19,50 +21,112 @@ LOG_SAMPLES = [
     '{timestamp} [SYSCALL] Unexpected process execution: /tmp/reverse_shell from {ip}'
 ]
 
-import os
+# Global control for automation: the generator runs while this event is set
+automation_event = asyncio.Event()
+automation_event.set()
+log_speed = float(os.getenv("AUTO_LOG_SPEED", "5")) # seconds between bursts
 
-# Use environment variable PORT or default to 8081
-PORT = os.getenv("PORT", "8081")
-API_URL = f"http://127.0.0.1:{PORT}/analyze/logs"
+# Generated logs are queued and analyzed in batches: a batch is sent once it
+# holds AUTO_LOG_BATCH_SIZE logs or AUTO_LOG_BATCH_MS after its first log
+# arrived, whichever comes first. At the default 5s pace the window is
+# shorter than the gap between bursts, so each burst goes out on its own and
+# the demo dashboard updates as soon as logs appear; batching only kicks in
+# when AUTO_LOG_SPEED is set below AUTO_LOG_BATCH_MS (e.g. 0.05s puts ~20
+# bursts in a batch).
+BATCH_SIZE = int(os.getenv("AUTO_LOG_BATCH_SIZE", "100"))
+BATCH_MS = int(os.getenv("AUTO_LOG_BATCH_MS", "1000"))
 
-# Global control for automation
-is_automation_on = True
-log_speed = 5 # seconds
+def _split_template(template: str):
+    """
+    Splits a log template into the literal text around its placeholders:
+    (before {timestamp}, between {timestamp} and {ip}, after {ip}). The last
+    part is None for templates without an {ip} placeholder.
+    """
+    before, sep, rest = template.partition("{timestamp}")
+    if not sep or "{timestamp}" in rest:
+        raise ValueError(f"Log template needs exactly one {{timestamp}}: {template!r}")
+    middle, sep, after = rest.partition("{ip}")
+    if not sep:
+        return before, rest, None
+    if "{ip}" in after:
+        raise ValueError(f"Log template has more than one {{ip}}: {template!r}")
+    return before, middle, after
 
-async def generate_logs():
-    # Wait for the FastAPI server to start
-    print("DEBUG: Log generator waiting 5s for server startup...")
-    await asyncio.sleep(5)
-    
-    async with httpx.AsyncClient() as client:
-        while True:
-            if not is_automation_on:
-                await asyncio.sleep(1)
-                continue
-
-            ips = ["192.168.1.10", "10.0.0.5", "172.16.0.8", "192.168.1.50", "45.33.22.11", "8.8.8.8"]
-            
-            logs = []
-            num_logs = random.randint(1, 3)
-            for _ in range(num_logs):
-                raw_log = random.choice(LOG_SAMPLES)
-                log = raw_log.format(
-                    timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    ip=random.choice(ips)
-                )
-                logs.append(log)
-
-            payload = {"logs": logs, "source": "Edge Network Monitor"}
+# LOG_SAMPLES pre-split once, so generating a log is a plain concatenation
+# instead of a str.format call that re-parses the template every time
+TEMPLATE_PARTS = [_split_template(t) for t in LOG_SAMPLES]
+
+SOURCE_IPS = ["192.168.1.10", "10.0.0.5", "172.16.0.8", "192.168.1.50", "45.33.22.11", "8.8.8.8"]
+
+# Delay after a failed batch, doubling up to the cap while failures persist
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 10.0
+
+pending_logs = deque()
+logs_ready = asyncio.Event()
+
+# Batches whose analysis failed; they are not retried, since a partly
+# applied batch would be counted twice on the dashboard
+dropped_batches = 0
+dropped_logs = 0
+
+async def produce_logs():
+    while True:
+        # Sleeps without waking while automation is paused
+        await automation_event.wait()
 
+        # A burst is generated within the same second, so it shares one timestamp
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        num_logs = random.randint(1, 3)
+        templates = random.choices(TEMPLATE_PARTS, k=num_logs)
+        ips = random.choices(SOURCE_IPS, k=num_logs)
+        for (before, middle, after), ip in zip(templates, ips):
+            if after is None:
+                pending_logs.append(before + timestamp + middle)
+            else:
+                pending_logs.append(before + timestamp + middle + ip + after)
+        logs_ready.set()
+
+        await asyncio.sleep(log_speed)
+
+async def send_log_batches():
+    global dropped_batches, dropped_logs
+    loop = asyncio.get_running_loop()
+    backoff = BACKOFF_INITIAL
+    while True:
+        await logs_ready.wait()
+
+        # Let the batch fill up until it is full or its deadline passes
+        deadline = loop.time() + BATCH_MS / 1000
+        while len(pending_logs) < BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            logs_ready.clear()
             try:
-                response = await client.post(API_URL, json=payload, timeout=5.0)
-                if response.status_code == 200:
-                    print(f"Auto logs sent (speed: {log_speed}s):", logs)
-                else:
-                    print(f"Warning: Server returned status {response.status_code} for logs")
-            except httpx.ConnectError:
-                print("Log generator: Server not reachable yet, retrying...")
-            except Exception as e:
-                print(f"Error sending logs: {type(e).__name__}: {e}")
-
-            await asyncio.sleep(log_speed)
+                await asyncio.wait_for(logs_ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        logs = [pending_logs.popleft() for _ in range(min(BATCH_SIZE, len(pending_logs)))]
+        if not pending_logs:
+            logs_ready.clear()
+
+        # Hand the batch straight to the analysis pipeline; this runs in the
+        # server process, so there is no need to go through HTTP
+        try:
+            await process_logs(logs, "Edge Network Monitor")
+            print(f"Auto logs sent (speed: {log_speed}s, batch: {len(logs)}):", logs)
+            backoff = BACKOFF_INITIAL
+        except Exception as e:
+            dropped_batches += 1
+            dropped_logs += len(logs)
+            print(f"Error sending logs: {type(e).__name__}: {e}; dropped batch of {len(logs)} "
+                  f"(total dropped: {dropped_batches} batches, {dropped_logs} logs), "
+                  f"next batch in {backoff:.1f}s")
+            # Jitter keeps the pause from lining up with other periodic work
+            await asyncio.sleep(backoff + random.random() * 0.1)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+async def generate_logs():
+    await asyncio.gather(produce_logs(), send_log_batches())
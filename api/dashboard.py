@@ -1,17 +1,41 @@
-from fastapi import APIRouter
+import time
+import asyncio
+import orjson
+from fastapi import APIRouter, Response
 from typing import Dict, Any, List
-from collections import Counter
+from collections import Counter, deque
+from functools import lru_cache
 
 router = APIRouter()
 
+# MITRE tactic keywords in priority order: an attack name counts towards the
+# first tactic with a keyword in it
+MITRE_TACTIC_KEYWORDS = (
+    (("BRUTE_FORCE", "CREDENTIAL"), "Credential Access"),
+    (("INJECTION", "XSS"), "Execution"),
+    (("RECON", "SCAN"), "Discovery"),
+    (("EXFIL",), "Exfiltration"),
+)
+
+@lru_cache(maxsize=1024)
+def mitre_tactic(name: str):
+    """
+    Returns the MITRE tactic for an attack name, or None. Attack names come
+    from a small set, so each one is classified only once.
+    """
+    for keywords, tactic in MITRE_TACTIC_KEYWORDS:
+        if any(k in name for k in keywords):
+            return tactic
+    return None
+
 # Shared state to hold latest results
 class DashboardState:
     def __init__(self):
         self.results = {
-            "raw_findings": [],
+            "raw_findings": deque(maxlen=500),
             "correlated_attacks": [],
             "llm_decisions": [],
-            "remediated_ids": [],
+            "remediated_ids": set(),
             "mitre_tactics": {
                 "Initial Access": 0,
                 "Execution": 0,
@@ -26,9 +50,9 @@ class DashboardState:
                 "Command and Control": 0
             },
             "history_stats": {
-                "times": [],
-                "threat_counts": [],
-                "remediation_counts": []
+                "times": deque(maxlen=20),
+                "threat_counts": deque(maxlen=20),
+                "remediation_counts": deque(maxlen=20)
             },
             "entity_counts": {
                 "Resources": 681,
@@ -37,97 +61,125 @@ class DashboardState:
                 "Roles": 280
             }
         }
-        self.history = []
         self.max_history = 100
+        self.history = deque(maxlen=self.max_history)
+        # Running tallies of correlated attacks, kept current by update()
+        self.severity_counter = Counter()
+        self.type_counter = Counter()
+        # Headline figures derived from the tallies, refreshed on every change
+        self.total = 0
+        self.critical = 0
+        self.active = 0
+        self.pulse = 100
+        # "%H:%M" label of the current minute for the trend charts, rebuilt
+        # only when the minute changes
+        self._minute = -1
+        self._minute_label = ""
+        # Encoded /dashboard/summary body; cleared whenever the state changes
+        self.summary_cache = None
+        # Serializes mutations and summary snapshots; must be used from the
+        # event loop, so other threads schedule update() onto it
+        self.lock = asyncio.Lock()
+
+    async def update(self, new_results: Dict[str, Any]):
+        async with self.lock:
+            self._apply(new_results)
 
-    def update(self, new_results: Dict[str, Any]):
+    def _apply(self, new_results: Dict[str, Any]):
         # Aggregate findings
         self.results["raw_findings"].extend(new_results.get("raw_findings", []))
         correlated = new_results.get("correlated_attacks", [])
         self.results["correlated_attacks"].extend(correlated)
         self.results["llm_decisions"].extend(new_results.get("llm_decisions", []))
 
-        # Update MITRE tactics based on attack types
+        # Update severity/type tallies and MITRE tactics based on attack types
+        severity_counter = self.severity_counter
+        type_counter = self.type_counter
+        tactics = self.results["mitre_tactics"]
         for attack in correlated:
-            name = attack.get("attack", "")
-            if "BRUTE_FORCE" in name or "CREDENTIAL" in name:
-                self.results["mitre_tactics"]["Credential Access"] += 1
-            elif "INJECTION" in name or "XSS" in name:
-                self.results["mitre_tactics"]["Execution"] += 1
-            elif "RECON" in name or "SCAN" in name:
-                self.results["mitre_tactics"]["Discovery"] += 1
-            elif "EXFIL" in name:
-                self.results["mitre_tactics"]["Exfiltration"] += 1
+            severity_counter[attack.get("severity", "MEDIUM")] += 1
+            name = attack.get("attack")
+            if name is None:
+                type_counter["OTHER"] += 1
+                continue
+            type_counter[name] += 1
+            tactic = mitre_tactic(name)
+            if tactic:
+                tactics[tactic] += 1
 
         # Update history for trend charts
-        import datetime
-        now = datetime.datetime.now().strftime("%H:%M")
-        self.results["history_stats"]["times"].append(now)
+        minute = int(time.time()) // 60
+        if minute != self._minute:
+            self._minute = minute
+            self._minute_label = time.strftime("%H:%M")
+        self.results["history_stats"]["times"].append(self._minute_label)
         self.results["history_stats"]["threat_counts"].append(len(self.results["correlated_attacks"]))
         self.results["history_stats"]["remediation_counts"].append(len(self.results["remediated_ids"]))
-
-        # Limit history
-        if len(self.results["history_stats"]["times"]) > 20:
-            for k in self.results["history_stats"]:
-                self.results["history_stats"][k] = self.results["history_stats"][k][-20:]
-
-        if len(self.results["raw_findings"]) > 500:
-            self.results["raw_findings"] = self.results["raw_findings"][-500:]
         
-        # Add to history
+        # Add to history (the bounded deques drop their oldest entries)
         self.history.append(new_results)
-        if len(self.history) > self.max_history:
-            self.history.pop(0)
+        self._refresh_totals()
+
+    def remediate(self, threat_id: str) -> bool:
+        """Marks a threat as remediated; returns False if it already was."""
+        remediated_ids = self.results["remediated_ids"]
+        if threat_id in remediated_ids:
+            return False
+        remediated_ids.add(threat_id)
+        self._refresh_totals()
+        return True
+
+    def _refresh_totals(self):
+        remediated_count = len(self.results["remediated_ids"])
+        self.total = len(self.results["correlated_attacks"])
+        self.critical = self.severity_counter["CRITICAL"] + self.severity_counter["HIGH"]
+        self.active = self.total - remediated_count
+        # Simple Security Pulse calculation (1-100)
+        # Starts at 100, drops by 5 for high, 10 for critical, up to 10 for regular threats
+        self.pulse = min(100, max(10, 100 - (self.critical * 15) - (self.total * 2) + (remediated_count * 5)))
+        self.summary_cache = None
 
 state = DashboardState()
 
-@router.get("/dashboard/summary")
-async def dashboard_summary():
-    """
-    Returns dashboard metrics from the latest analysis
-    """
-    correlated = state.results.get("correlated_attacks", [])
+def _build_summary() -> Dict[str, Any]:
     decisions = state.results.get("llm_decisions", [])
     raw_findings = state.results.get("raw_findings", [])
 
-    severity_counter = Counter()
-    type_counter = Counter()
-    
-    for attack in correlated:
-        severity = attack.get("severity", "MEDIUM")
-        severity_counter[severity] += 1
-        type_counter[attack.get("attack", "OTHER")] += 1
-
-    total = len(correlated)
-    remediated_count = len(state.results.get("remediated_ids", []))
-    critical = severity_counter.get("CRITICAL", 0) + severity_counter.get("HIGH", 0)
-    
-    # Simple Security Pulse calculation (1-100)
-    # Starts at 100, drops by 5 for high, 10 for critical, up to 10 for regular threats
-    pulse = max(10, 100 - (critical * 15) - (total * 2) + (remediated_count * 5))
-    pulse = min(100, pulse)
-
     return {
-        "total_threats": total,
-        "active": total - remediated_count,
-        "remediated": remediated_count,
-        "critical": critical,
-        "pulse": int(pulse),
-        "by_severity": dict(severity_counter),
-        "by_type": dict(type_counter),
+        "total_threats": state.total,
+        "active": state.active,
+        "remediated": len(state.results["remediated_ids"]),
+        "critical": state.critical,
+        "pulse": state.pulse,
+        "by_severity": dict(state.severity_counter),
+        "by_type": dict(state.type_counter),
         "decisions": decisions,
         "raw_count": len(raw_findings),
         "mitre_tactics": state.results["mitre_tactics"],
-        "history": state.results["history_stats"],
+        "history": {k: list(v) for k, v in state.results["history_stats"].items()},
         "entities": state.results["entity_counts"]
     }
 
+@router.get("/dashboard/summary")
+async def dashboard_summary():
+    """
+    Returns dashboard metrics from the latest analysis
+    """
+    # Polls between updates reuse the already encoded body
+    if state.summary_cache is None:
+        async with state.lock:
+            summary = _build_summary()
+        # Encode outside the lock; nothing awaits between the snapshot and
+        # this point, so no update can interleave
+        state.summary_cache = orjson.dumps(summary)
+    return Response(content=state.summary_cache, media_type="application/json")
+
 @router.post("/dashboard/update-results")
 async def update_results(analysis_result: Dict[str, Any]):
     """
     Update the latest results for the dashboard
     """
-    state.update(analysis_result)
+    await state.update(analysis_result)
     return {"status": "updated"}
 
 @router.post("/dashboard/remediate")
@@ -136,7 +188,9 @@ async def remediate_threat(request: Dict[str, str]):
     Mark a threat as remediated
     """
     threat_id = request.get("threat_id")
-    if threat_id and threat_id not in state.results["remediated_ids"]:
-        state.results["remediated_ids"].append(threat_id)
-        return {"status": "success", "message": f"Threat {threat_id} remediated"}
-    return {"status": "error", "message": "Invalid threat ID or already remediated"}
\ No newline at end of file
+    if threat_id:
+        async with state.lock:
+            remediated = state.remediate(threat_id)
+        if remediated:
+            return {"status": "success", "message": f"Threat {threat_id} remediated"}
+    return {"status": "error", "message": "Invalid threat ID or already remediated"}
@@ -1,27 +1,30 @@
 import sys
 import os
+import time
 import asyncio
 from typing import List, Optional
 from fastapi import FastAPI, Request, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from api.auto_logs import generate_logs
+from api.auto_logs import generate_logs, automation_event
 from api.websocket_manager import manager as ws_manager
 
 # Add the project root to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# ===== Import Agents =====
-from agents.log_analyzer.agent import LogAnalysisAgent
-from agents.correlation.agent import CorrelationAgent
-from agents.llm_reasoner.agent import LLMReasoningAgent
-from agents.email_verification.agent import EmailVerificationAgent
-from agents.ip_analyzer.agent import IPRangeAnalyzerAgent
+# ===== Import Agents and Pipeline =====
+from api.pipeline import (
+    log_analyzer, correlation_agent, llm_agent, email_agent, ip_agent,
+    process_all, submit_logs, analysis_worker, ANALYSIS_WORKERS
+)
+
+from agents.log_analyzer.agent import shutdown_scan_pool
 
 # ===== Import Dashboard Router =====
-from api.dashboard import router as dashboard_router
+from api.dashboard import router as dashboard_router, state
 
 # ===== Import Log Ingestors =====
 try:
@@ -34,7 +37,10 @@ except ImportError as e:
     LOG_INGESTORS_AVAILABLE = False
 
 # ===== Initialize FastAPI App =====
-app = FastAPI(title="CyberGuard AI: Multi-Agent Detection")
+app = FastAPI(
+    title="CyberGuard AI: Multi-Agent Detection",
+    default_response_class=ORJSONResponse
+)
 
 background_tasks = set()
 main_loop = None
@@ -43,11 +49,31 @@ main_loop = None
 async def start_auto_logs():
     global main_loop
     main_loop = asyncio.get_running_loop()
+    # Python 3.12+: tasks run their first step as soon as they are created,
+    # so the many that finish without suspending (cheap awaits, broadcasts
+    # with no clients) never go through the loop's scheduling
+    if hasattr(asyncio, "eager_task_factory"):
+        main_loop.set_task_factory(asyncio.eager_task_factory)
+
     task = asyncio.create_task(generate_logs())
     background_tasks.add(task)
     task.add_done_callback(background_tasks.discard)
     print("DEBUG: Background log generator task started")
 
+    for _ in range(ANALYSIS_WORKERS):
+        task = asyncio.create_task(analysis_worker())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+    task = asyncio.create_task(live_log_consumer())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+@app.on_event("shutdown")
+async def stop_scan_pool():
+    # Log scanner worker processes are started on demand by large inputs
+    shutdown_scan_pool()
+
 # ===== Middleware =====
 app.add_middleware(
     CORSMiddleware,
@@ -67,13 +93,6 @@ app.mount(
 # ===== Templates =====
 templates = Jinja2Templates(directory=os.path.join("api", "templates"))
 
-# ===== Initialize Agents =====
-log_analyzer = LogAnalysisAgent()
-correlation_agent = CorrelationAgent()
-llm_agent = LLMReasoningAgent()
-email_agent = EmailVerificationAgent()
-ip_agent = IPRangeAnalyzerAgent()
-
 # ===== Initialize Log Ingestors =====
 log_ingestors = {
     "windows_events": None,
@@ -94,79 +113,112 @@ log_source_stats = {
     "network_capture": {"events": 0, "threats": 0}
 }
 
-def handle_live_log(log_data: dict):
-    """Handle incoming live log from ingestors (called from background threads)"""
+# Live logs from the ingestor threads wait here for live_log_consumer(); when
+# it is full new logs are dropped so the ingestor threads never block
+LIVE_LOG_QUEUE_SIZE = 1000
+live_log_queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_LOG_QUEUE_SIZE)
+
+def handle_live_logs(logs: List[dict]):
+    """Handle a batch of live logs from an ingestor (called from background threads)"""
+    if main_loop is None:
+        print("ERROR: Main loop not initialized yet")
+        return
     try:
-        # Use the stored main event loop
-        global main_loop
-        if main_loop is None:
-            print("ERROR: Main loop not initialized yet")
-            return
-            
-        source = log_data.get("source", "live_ingestion")
+        # A single hop onto the event loop per batch; the analysis runs there later
+        main_loop.call_soon_threadsafe(_enqueue_live_logs, logs)
+    except RuntimeError as e:
+        print(f"Error handling live logs: {e}")
+
+def _enqueue_live_logs(logs: List[dict]):
+    for log_data in logs:
+        try:
+            live_log_queue.put_nowait(log_data)
+        except asyncio.QueueFull:
+            print(f"Live log queue full, dropping log from {log_data.get('source', 'live_ingestion')}")
+
+async def _process_live_log(log_data: dict) -> List:
+    """
+    Runs one live log through the pipeline and returns its correlated
+    attacks; the threat update for them is broadcast once per batch.
+    """
+    source = log_data.get("source", "live_ingestion")
+    
+    # Update event stats
+    if source in log_source_stats:
+        log_source_stats[source]["events"] += 1
         
-        # Update event stats
-        if source in log_source_stats:
-            log_source_stats[source]["events"] += 1
-            
-        # Convert to log format and analyze
-        log_text = log_data.get("message", "")
+    # Convert to log format and analyze
+    log_text = log_data.get("message", "")
+    findings = await log_analyzer.analyze(log_text)
+    if not findings:
+        return []
+    
+    # Process through existing pipeline
+    correlated = correlation_agent.correlate(findings)
+    
+    # Update threat stats
+    if source in log_source_stats and correlated:
+        log_source_stats[source]["threats"] += len(correlated)
+    
+    decisions = await llm_agent.reason(correlated)
+    
+    await state.update({
+        "raw_findings": findings,
+        "correlated_attacks": correlated,
+        "llm_decisions": decisions,
+        "source": source
+    })
+    
+    # Send alert for critical threats
+    for attack in correlated:
+        if attack.get("severity") in ["CRITICAL", "HIGH"]:
+            await ws_manager.broadcast_alert(
+                "live_threat",
+                f"Live threat detected: {attack.get('attack', 'Unknown')} from {log_data.get('source_ip', 'unknown')}",
+                attack.get("severity", "HIGH")
+            )
+    return correlated
+
+# Most live logs taken off the queue and processed together
+LIVE_LOG_BATCH_SIZE = 32
+
+async def live_log_consumer():
+    while True:
+        # Take whatever has queued up behind the first log, up to a batch
+        batch = [await live_log_queue.get()]
+        while len(batch) < LIVE_LOG_BATCH_SIZE and not live_log_queue.empty():
+            batch.append(live_log_queue.get_nowait())
         
-        # Run async analysis in the main loop
-        future = asyncio.run_coroutine_threadsafe(log_analyzer.analyze(log_text), main_loop)
-        findings = future.result(timeout=10)
+        # The logs of a batch run concurrently, so one log's LLM call
+        # overlaps the analysis and reasoning of the others
+        results = await asyncio.gather(
+            *(_process_live_log(log_data) for log_data in batch),
+            return_exceptions=True
+        )
         
-        if findings:
-            # Process through existing pipeline
-            correlated = correlation_agent.correlate(findings)
-            
-            # Update threat stats
-            if source in log_source_stats and correlated:
-                log_source_stats[source]["threats"] += len(correlated)
-            
-            # Run async reasoning in the main loop
-            reason_future = asyncio.run_coroutine_threadsafe(llm_agent.reason(correlated), main_loop)
-            decisions = reason_future.result(timeout=10)
-            
-            # Update dashboard state
-            from api.dashboard import state
-            state.update({
-                "raw_findings": [str(f) for f in findings],
-                "correlated_attacks": correlated,
-                "llm_decisions": decisions,
-                "source": source
-            })
-            
-            # Broadcast via WebSocket safely
-            asyncio.run_coroutine_threadsafe(
-                ws_manager.broadcast_threat_update({
-                    "new_threats": correlated,
-                    "source": source
-                }),
-                main_loop
-            )
-            
-            # Send alert for critical threats
-            for attack in correlated:
-                if attack.get("severity") in ["CRITICAL", "HIGH"]:
-                    asyncio.run_coroutine_threadsafe(
-                        ws_manager.broadcast_alert(
-                            "live_threat",
-                            f"Live threat detected: {attack.get('attack', 'Unknown')} from {log_data.get('source_ip', 'unknown')}",
-                            attack.get("severity", "HIGH")
-                        ),
-                        main_loop
-                    )
+        new_threats = []
+        threat_sources = set()
+        for log_data, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                print(f"Error handling live log: {result}")
+            elif result:
+                new_threats.extend(result)
+                threat_sources.add(log_data.get("source", "live_ingestion"))
         
-        # Always broadcast log source stats update
-        if source in log_source_stats:
-            asyncio.run_coroutine_threadsafe(
-                ws_manager.broadcast_log_source_update(source, log_source_stats[source]),
-                main_loop
-            )
+        try:
+            # One threat update for the whole batch
+            if new_threats:
+                await ws_manager.broadcast_threat_update({
+                    "new_threats": new_threats,
+                    "source": threat_sources.pop() if len(threat_sources) == 1 else "live_ingestion"
+                })
             
-    except Exception as e:
-        print(f"Error handling live log: {e}")
+            # Always broadcast log source stats update, once per source
+            for source in {log_data.get("source", "live_ingestion") for log_data in batch}:
+                if source in log_source_stats:
+                    await ws_manager.broadcast_log_source_update(source, log_source_stats[source])
+        except Exception as e:
+            print(f"Error handling live log: {e}")
 
 # ===== Request Models =====
 class LogRequest(BaseModel):
@@ -181,71 +233,75 @@ class IPRequest(BaseModel):
     scan_data: str
     source: Optional[str] = "Network Scan"
 
-# ===== Unified Processor =====
-async def _process_all(findings: List, source: str):
-    correlated = correlation_agent.correlate(findings)
-    decisions = await llm_agent.reason(correlated)
-
-    results = {
-        "raw_findings": [str(f) for f in findings],
-        "correlated_attacks": correlated,
-        "llm_decisions": decisions,
-        "source": source
-    }
-
-    # Automatically update dashboard state
-    from api.dashboard import state
-    state.update(results)
-    
-    # Broadcast real-time update via WebSocket
-    await ws_manager.broadcast_threat_update({
-        "total_threats": len(correlated),
-        "new_threats": correlated,
-        "decisions": decisions,
-        "source": source
-    })
-    
-    # Send alert for critical threats
-    critical_threats = [t for t in correlated if t.get("severity") in ["CRITICAL", "HIGH"]]
-    if critical_threats:
-        await ws_manager.broadcast_alert(
-            "critical_threat",
-            f"{len(critical_threats)} critical threat(s) detected from {source}",
-            "CRITICAL"
-        )
-    
-    return results
-
 # ===== Endpoints =====
 @app.post("/analyze/logs")
-async def analyze_logs(request: LogRequest):
-    raw_logs_text = "\n".join(request.logs)
-    findings = await log_analyzer.analyze(raw_logs_text)
-    return await _process_all(findings, request.source)
+async def analyze_logs(request: LogRequest, background: bool = False):
+    if background:
+        # Opt-in: the batch is analyzed by the background workers and its
+        # results only reach the dashboard state and the websocket feed
+        job_id = await submit_logs(request.logs, request.source)
+        return {"status": "accepted", "id": job_id}
+
+    findings = await log_analyzer.analyze("\n".join(request.logs))
+    return await process_all(findings, request.source)
 
 @app.post("/analyze/email")
 async def analyze_email(request: EmailRequest):
     findings = await email_agent.analyze(request.content)
-    return await _process_all(findings, request.source)
+    return await process_all(findings, request.source)
 
 @app.post("/analyze/ip")
 async def analyze_ip(request: IPRequest):
     findings = await ip_agent.analyze(request.scan_data)
-    return await _process_all(findings, request.source)
+    return await process_all(findings, request.source)
+
+# Uploads are read in chunks of this size rather than all at once
+UPLOAD_CHUNK_SIZE = 1 << 16
+
+async def _iter_upload(file: UploadFile):
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+async def _classify_upload(file: UploadFile) -> str:
+    """
+    Decides whether an upload is an email, a network scan or a log file by
+    streaming over its content once. Chunks overlap by a few bytes so
+    keywords split across a chunk boundary are still found.
+    """
+    if "email" in file.filename.lower():
+        return "email"
+    found_scan_keyword = False
+    tail = b""
+    async for chunk in _iter_upload(file):
+        window = tail + chunk.lower()
+        if b"subject:" in window:
+            return "email"
+        if not found_scan_keyword and (b"nmap" in window or b"port" in window):
+            found_scan_keyword = True
+        tail = window[-7:]
+    return "ip" if found_scan_keyword else "logs"
 
 @app.post("/analyze/upload")
 async def analyze_upload(file: UploadFile = File(...)):
-    content = await file.read()
-    text = content.decode("utf-8")
-    
-    if "email" in file.filename.lower() or "subject:" in text.lower():
-        findings = await email_agent.analyze(text)
-    elif "nmap" in text.lower() or "port" in text.lower():
-        findings = await ip_agent.analyze(text)
+    kind = await _classify_upload(file)
+    await file.seek(0)
+
+    if kind == "logs":
+        # Scan the log file block by block as it is read back, so the whole
+        # decoded text never has to be held in memory
+        findings = [f async for f in log_analyzer.stream_analyze(_iter_upload(file))]
     else:
-        findings = await log_agent.analyze(text)
+        # The email and scan agents send the full text to the LLM
+        text = (await file.read()).decode("utf-8")
+        if kind == "email":
+            findings = await email_agent.analyze(text)
+        else:
+            findings = await ip_agent.analyze(text)
     
-    return await _process_all(findings, f"Uploaded File: {file.filename}")
+    return await process_all(findings, f"Uploaded File: {file.filename}")
 
 # ===== Register Dashboard Routes =====
 app.include_router(dashboard_router)
@@ -253,14 +309,39 @@ app.include_router(dashboard_router)
 # ===== Serve Dashboard Page =====
 @app.get("/dashboard")
 def dashboard(request: Request):
-    import time
     version = int(time.time())
     return templates.TemplateResponse(
         "index.html",
         {"request": request, "version": version}
     )
 
+# ===== Auto Log Control Endpoints =====
+@app.post("/auto-logs/pause")
+async def pause_auto_logs():
+    """
+    Pause the automatic log generator
+    """
+    automation_event.clear()
+    return {"status": "paused"}
+
+@app.post("/auto-logs/resume")
+async def resume_auto_logs():
+    """
+    Resume the automatic log generator
+    """
+    automation_event.set()
+    return {"status": "running"}
+
 # ===== Log Source Management Endpoints =====
+# Default web server log paths (user can configure via environment or config file)
+DEFAULT_WEB_LOG_PATHS = (
+    r"C:\logs\access.log",  # Custom path
+    r"C:\Apache24\logs\access.log",  # Apache Windows
+    r"C:\nginx\logs\access.log",  # Nginx Windows
+    r"/var/log/apache2/access.log",  # Apache Linux
+    r"/var/log/nginx/access.log"  # Nginx Linux
+)
+
 @app.get("/ingest/sources")
 async def get_log_sources():
     """Get status of all log sources"""
@@ -302,7 +383,7 @@ async def toggle_log_source(source_name: str):
             if new_state:
                 # Start Windows Event ingestor
                 if log_ingestors["windows_events"] is None:
-                    log_ingestors["windows_events"] = WindowsEventIngestor(callback=handle_live_log)
+                    log_ingestors["windows_events"] = WindowsEventIngestor(batch_callback=handle_live_logs)
                 log_ingestors["windows_events"].start()
                 log_sources_enabled["windows_events"] = True
                 message = "Windows Event Viewer monitoring started"
@@ -317,20 +398,11 @@ async def toggle_log_source(source_name: str):
             if new_state:
                 # Start web server log parser
                 if log_ingestors["web_server_logs"] is None:
-                    log_ingestors["web_server_logs"] = WebServerLogParser(callback=handle_live_log)
-                
-                # Default log paths (user can configure via environment or config file)
-                default_log_paths = [
-                    r"C:\logs\access.log",  # Custom path
-                    r"C:\Apache24\logs\access.log",  # Apache Windows
-                    r"C:\nginx\logs\access.log",  # Nginx Windows
-                    r"/var/log/apache2/access.log",  # Apache Linux
-                    r"/var/log/nginx/access.log"  # Nginx Linux
-                ]
+                    log_ingestors["web_server_logs"] = WebServerLogParser(batch_callback=handle_live_logs)
                 
-                # Check which paths exist and use them
-                import os
-                existing_paths = [p for p in default_log_paths if os.path.exists(p)]
+                # Check which paths exist now and use them; files may be
+                # created after startup, so this is not cached
+                existing_paths = [p for p in DEFAULT_WEB_LOG_PATHS if os.path.exists(p)]
                 
                 if existing_paths:
                     log_ingestors["web_server_logs"].start(existing_paths)
@@ -354,7 +426,7 @@ async def toggle_log_source(source_name: str):
             if new_state:
                 # Start network capture
                 if log_ingestors["network_capture"] is None:
-                    log_ingestors["network_capture"] = NetworkCapture(callback=handle_live_log)
+                    log_ingestors["network_capture"] = NetworkCapture(batch_callback=handle_live_logs)
                 log_ingestors["network_capture"].start()
                 log_sources_enabled["network_capture"] = True
                 message = "Network traffic capture started"
@@ -0,0 +1,95 @@
+import os
+import uuid
+import asyncio
+from typing import List
+from api.websocket_manager import manager as ws_manager
+from api.dashboard import state
+
+# ===== Import Agents =====
+from agents.log_analyzer.agent import LogAnalysisAgent
+from agents.correlation.agent import CorrelationAgent
+from agents.llm_reasoner.agent import LLMReasoningAgent
+from agents.email_verification.agent import EmailVerificationAgent
+from agents.ip_analyzer.agent import IPRangeAnalyzerAgent
+
+# ===== Initialize Agents =====
+log_analyzer = LogAnalysisAgent()
+correlation_agent = CorrelationAgent()
+llm_agent = LLMReasoningAgent()
+email_agent = EmailVerificationAgent()
+ip_agent = IPRangeAnalyzerAgent()
+
+# ===== Unified Processor =====
+async def publish_findings(findings: List, source: str):
+    """
+    Correlates and reasons over findings, records them on the dashboard and
+    broadcasts the update. Returns the correlated attacks and decisions.
+    """
+    correlated = correlation_agent.correlate(findings)
+    decisions = await llm_agent.reason(correlated)
+
+    # Automatically update dashboard state; it only counts the raw
+    # findings, so they are stored as they are rather than as strings
+    await state.update({
+        "raw_findings": findings,
+        "correlated_attacks": correlated,
+        "llm_decisions": decisions,
+        "source": source
+    })
+
+    # Broadcast real-time update via WebSocket
+    await ws_manager.broadcast_threat_update({
+        "total_threats": len(correlated),
+        "new_threats": correlated,
+        "decisions": decisions,
+        "source": source
+    })
+
+    # Send alert for critical threats
+    critical_count = sum(1 for t in correlated if t.get("severity") in ("CRITICAL", "HIGH"))
+    if critical_count:
+        await ws_manager.broadcast_alert(
+            "critical_threat",
+            f"{critical_count} critical threat(s) detected from {source}",
+            "CRITICAL"
+        )
+
+    return correlated, decisions
+
+async def process_all(findings: List, source: str):
+    """Runs findings through the pipeline and returns the results for an API response."""
+    correlated, decisions = await publish_findings(findings, source)
+    return {
+        "raw_findings": [str(f) for f in findings],
+        "correlated_attacks": correlated,
+        "llm_decisions": decisions,
+        "source": source
+    }
+
+async def process_logs(logs: List[str], source: str):
+    """Runs a batch of raw log lines through analysis, correlation and reasoning."""
+    findings = await log_analyzer.analyze("\n".join(logs))
+    await publish_findings(findings, source)
+
+# ===== Background Analysis Queue =====
+# Log batches posted to /analyze/logs?background=true wait here for one of the workers
+ANALYSIS_QUEUE_SIZE = 1000
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+
+work_queue: asyncio.Queue = asyncio.Queue(maxsize=ANALYSIS_QUEUE_SIZE)
+
+async def submit_logs(logs: List[str], source: str) -> str:
+    """Queues a batch of log lines for background analysis and returns its job id."""
+    job_id = uuid.uuid4().hex
+    await work_queue.put((job_id, logs, source))
+    return job_id
+
+async def analysis_worker():
+    while True:
+        job_id, logs, source = await work_queue.get()
+        try:
+            await process_logs(logs, source)
+        except Exception as e:
+            print(f"Error processing log job {job_id}: {e}")
+        finally:
+            work_queue.task_done()
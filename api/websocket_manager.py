@@ -1,26 +1,52 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List, Dict, Any
-import json
+from typing import Set, Dict, Any
+from dataclasses import dataclass
+import time
+import orjson
 import asyncio
 from datetime import datetime
 
+# Seconds a client gets to take a broadcast before it is dropped, so one
+# slow client can neither hold up a broadcast nor build up unsent messages
+SEND_TIMEOUT = 0.5
+
+# Seconds a get_stats() result is reused, so clients spamming "stats" do not
+# each walk every connection
+STATS_TTL = 1.0
+
+@dataclass(slots=True)
+class ConnectionInfo:
+    """Bookkeeping for one websocket connection"""
+    client_id: str
+    connected_at: str
+    broadcasts_at_connect: int
+    message_count: int = 0  # personal messages only
+
 class ConnectionManager:
     """Manages WebSocket connections for real-time threat updates"""
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.connection_metadata: Dict[WebSocket, Dict[str, Any]] = {}
+        self.active_connections: Set[WebSocket] = set()
+        self.connection_metadata: Dict[WebSocket, ConnectionInfo] = {}
+        # Broadcasts sent so far. A client that fails a send is dropped, so
+        # each one has received every broadcast since it connected and its
+        # share is worked out in get_stats() instead of counted per send.
+        self.broadcast_count = 0
+        self._stats_cache = None
+        self._stats_cache_time = 0.0
     
     async def connect(self, websocket: WebSocket, client_id: str = None):
         """Accept and register a new WebSocket connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        self.connection_metadata[websocket] = {
-            "client_id": client_id or f"client_{len(self.active_connections)}",
-            "connected_at": datetime.now().isoformat(),
-            "message_count": 0
-        }
-        print(f"[WebSocket] Client connected: {self.connection_metadata[websocket]['client_id']}")
+        self.active_connections.add(websocket)
+        info = ConnectionInfo(
+            client_id=client_id or f"client_{len(self.active_connections)}",
+            connected_at=datetime.now().isoformat(),
+            broadcasts_at_connect=self.broadcast_count
+        )
+        self.connection_metadata[websocket] = info
+        self._stats_cache = None
+        print(f"[WebSocket] Client connected: {info.client_id}")
         
         # Send welcome message
         await self.send_personal_message({
@@ -33,38 +59,54 @@ class ConnectionManager:
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
         if websocket in self.active_connections:
-            client_id = self.connection_metadata.get(websocket, {}).get("client_id", "unknown")
-            self.active_connections.remove(websocket)
-            if websocket in self.connection_metadata:
-                del self.connection_metadata[websocket]
+            info = self.connection_metadata.pop(websocket, None)
+            client_id = info.client_id if info else "unknown"
+            self.active_connections.discard(websocket)
+            self._stats_cache = None
             print(f"[WebSocket] Client disconnected: {client_id}")
     
     async def send_personal_message(self, message: Dict[str, Any], websocket: WebSocket):
         """Send a message to a specific client"""
         try:
-            await websocket.send_json(message)
-            if websocket in self.connection_metadata:
-                self.connection_metadata[websocket]["message_count"] += 1
+            await websocket.send_text(orjson.dumps(message).decode())
+            info = self.connection_metadata.get(websocket)
+            if info:
+                info.message_count += 1
         except Exception as e:
             print(f"[WebSocket] Error sending personal message: {e}")
     
     async def broadcast(self, message: Dict[str, Any]):
         """Broadcast a message to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-                if connection in self.connection_metadata:
-                    self.connection_metadata[connection]["message_count"] += 1
-            except WebSocketDisconnect:
-                disconnected.append(connection)
-            except Exception as e:
-                print(f"[WebSocket] Error broadcasting to client: {e}")
-                disconnected.append(connection)
+        if not self.active_connections:
+            return
+        # Encode once for all clients and send to them concurrently rather
+        # than one after the other. Frames stay text: the dashboard client
+        # JSON.parses them and would get a Blob from a binary frame.
+        payload = orjson.dumps(message).decode()
+        connections = list(self.active_connections)
+        self.broadcast_count += 1
+        results = await asyncio.gather(
+            *(self._send_broadcast(connection, payload) for connection in connections),
+            return_exceptions=True
+        )
         
         # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+        for connection, result in zip(connections, results):
+            if result is not None:
+                if not isinstance(result, WebSocketDisconnect):
+                    print(f"[WebSocket] Error broadcasting to client: {result}")
+                self.disconnect(connection)
+    
+    async def _send_broadcast(self, websocket: WebSocket, payload: str):
+        try:
+            await asyncio.wait_for(websocket.send_text(payload), SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            print("[WebSocket] Client too slow to receive broadcasts, closing")
+            try:
+                await asyncio.wait_for(websocket.close(code=1011), SEND_TIMEOUT)
+            except Exception:
+                pass
+            raise WebSocketDisconnect(1011)
     
     async def broadcast_threat_update(self, threat_data: Dict[str, Any]):
         """Broadcast a threat update to all clients"""
@@ -109,21 +151,25 @@ class ConnectionManager:
     
     def get_stats(self) -> Dict[str, Any]:
         """Get connection statistics"""
-        return {
+        now = time.monotonic()
+        if self._stats_cache is not None and now - self._stats_cache_time < STATS_TTL:
+            return self._stats_cache
+        
+        clients = [
+            {
+                "client_id": info.client_id,
+                "connected_at": info.connected_at,
+                "message_count": info.message_count + self.broadcast_count - info.broadcasts_at_connect
+            }
+            for info in self.connection_metadata.values()
+        ]
+        self._stats_cache = {
             "active_connections": len(self.active_connections),
-            "total_messages": sum(
-                meta.get("message_count", 0) 
-                for meta in self.connection_metadata.values()
-            ),
-            "clients": [
-                {
-                    "client_id": meta.get("client_id"),
-                    "connected_at": meta.get("connected_at"),
-                    "message_count": meta.get("message_count", 0)
-                }
-                for meta in self.connection_metadata.values()
-            ]
+            "total_messages": sum(client["message_count"] for client in clients),
+            "clients": clients
         }
+        self._stats_cache_time = now
+        return self._stats_cache
 
 # Global connection manager instance
 manager = ConnectionManager()
@@ -2,53 +2,62 @@
 Test Log Injector - Adds new logs to access.log to test real-time detection
 Run this script to simulate live web server activity with various attack types
 """
+import os
 import time
 import random
 from datetime import datetime
 
-# Sample log entries
+# Logs written per batch and seconds between batches; raise the batch size
+# and lower the interval to put real load on the ingestor
+BATCH_SIZE = int(os.getenv("INJECT_BATCH_SIZE", "1"))
+INTERVAL = float(os.getenv("INJECT_INTERVAL", "3"))
+
+# Sample log entries (%-style: ip suffix, timestamp)
 ATTACK_LOGS = [
-    '192.168.1.{} - - [{}] "GET /login.php?id=1\' OR \'1\'=\'1 HTTP/1.1" 200 890',
-    '10.0.0.{} - - [{}] "GET /search.php?q=<script>alert(1)</script> HTTP/1.1" 200 456',
-    '172.16.0.{} - - [{}] "GET /files?file=../../../../etc/passwd HTTP/1.1" 403 234',
-    '45.33.22.{} - - [{}] "GET /admin/ HTTP/1.1" 404 192 "-" "Nikto/2.1.6"',
-    '66.249.64.{} - - [{}] "GET /download?id=1 UNION SELECT password FROM users-- HTTP/1.1" 200 567',
+    '192.168.1.%d - - [%s] "GET /login.php?id=1\' OR \'1\'=\'1 HTTP/1.1" 200 890',
+    '10.0.0.%d - - [%s] "GET /search.php?q=<script>alert(1)</script> HTTP/1.1" 200 456',
+    '172.16.0.%d - - [%s] "GET /files?file=../../../../etc/passwd HTTP/1.1" 403 234',
+    '45.33.22.%d - - [%s] "GET /admin/ HTTP/1.1" 404 192 "-" "Nikto/2.1.6"',
+    '66.249.64.%d - - [%s] "GET /download?id=1 UNION SELECT password FROM users-- HTTP/1.1" 200 567',
 ]
 
 NORMAL_LOGS = [
-    '192.168.1.{} - - [{}] "GET /index.html HTTP/1.1" 200 1234',
-    '192.168.1.{} - - [{}] "GET /about.html HTTP/1.1" 200 567',
-    '192.168.1.{} - - [{}] "POST /contact.php HTTP/1.1" 200 89',
+    '192.168.1.%d - - [%s] "GET /index.html HTTP/1.1" 200 1234',
+    '192.168.1.%d - - [%s] "GET /about.html HTTP/1.1" 200 567',
+    '192.168.1.%d - - [%s] "POST /contact.php HTTP/1.1" 200 89',
 ]
 
-def generate_log():
-    """Generate a random log entry"""
-    ip_suffix = random.randint(1, 254)
+# 30% chance of attack log, 70% normal, spread evenly over each list
+ALL_LOGS = ATTACK_LOGS + NORMAL_LOGS
+LOG_WEIGHTS = [0.3 / len(ATTACK_LOGS)] * len(ATTACK_LOGS) + [0.7 / len(NORMAL_LOGS)] * len(NORMAL_LOGS)
+IP_SUFFIXES = range(1, 255)
+
+def generate_logs(count):
+    """Generate a batch of random log entries sharing one timestamp"""
     timestamp = datetime.now().strftime("%d/%b/%Y:%H:%M:%S +0530")
-    
-    # 30% chance of attack log, 70% normal
-    if random.random() < 0.3:
-        log_template = random.choice(ATTACK_LOGS)
-    else:
-        log_template = random.choice(NORMAL_LOGS)
-    
-    return log_template.format(ip_suffix, timestamp)
+    templates = random.choices(ALL_LOGS, weights=LOG_WEIGHTS, k=count)
+    ip_suffixes = random.choices(IP_SUFFIXES, k=count)
+    return [template % (ip_suffix, timestamp) for template, ip_suffix in zip(templates, ip_suffixes)]
 
 def main():
     log_file = r"C:\logs\access.log"
     print(f"🚀 Starting log injector...")
     print(f"📝 Writing to: {log_file}")
-    print(f"⏱️  Interval: 3 seconds")
+    print(f"⏱️  Interval: {INTERVAL:g} seconds, {BATCH_SIZE} log(s) per batch")
     print(f"🔴 Press Ctrl+C to stop\n")
     
     try:
         with open(log_file, "a") as f:
             while True:
-                log = generate_log()
-                f.write(log + "\n")
+                logs = generate_logs(BATCH_SIZE)
+                # One write and one flush per batch rather than per log
+                f.write("\n".join(logs) + "\n")
                 f.flush()  # Force write to disk
-                print(f"✅ Added: {log}")
-                time.sleep(3)  # Wait 3 seconds between logs
+                if BATCH_SIZE == 1:
+                    print(f"✅ Added: {logs[0]}")
+                else:
+                    print(f"✅ Added {BATCH_SIZE} logs")
+                time.sleep(INTERVAL)  # Wait between batches
     except KeyboardInterrupt:
         print("\n\n⏸️  Log injector stopped")
     except Exception as e:
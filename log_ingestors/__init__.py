@@ -5,10 +5,25 @@ Provides real-world log ingestion from various sources:
 - Windows Event Viewer
 - Web Server Logs (Apache/Nginx)
 - Network Traffic Capture
+
+Each ingestor is imported on first use, so a source's platform packages
+(pywin32, scapy) are only loaded when that source is actually used.
 """
 
-from .windows_events_real import WindowsEventIngestor
-from .web_server_logs import WebServerLogParser
-from .network_capture import NetworkCapture
+import importlib
+
+_MODULES = {
+    'WindowsEventIngestor': '.windows_events_real',
+    'WebServerLogParser': '.web_server_logs',
+    'NetworkCapture': '.network_capture',
+    'BatchEmitter': '.batch_emitter',
+}
+
+__all__ = ['WindowsEventIngestor', 'WebServerLogParser', 'NetworkCapture', 'BatchEmitter']
+
 
-__all__ = ['WindowsEventIngestor', 'WebServerLogParser', 'NetworkCapture']
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
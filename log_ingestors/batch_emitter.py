@@ -0,0 +1,79 @@
+"""
+Batch Emitter
+
+Collects normalized events from an ingestor's threads and hands them to a
+callback in lists, so downstream consumers get one call per batch instead
+of one per event.
+"""
+
+import threading
+from typing import Callable, Dict, List
+
+
+class BatchEmitter:
+    """Buffer events and flush them to a batch callback"""
+
+    def __init__(self, batch_callback: Callable[[List[Dict]], None], max_batch=256, interval=0.05):
+        """
+        Initialize Batch Emitter
+
+        Args:
+            batch_callback: Function to call with each list of events
+            max_batch: Flush as soon as this many events are waiting
+            interval: Seconds between flushes of a partial batch
+        """
+        self.batch_callback = batch_callback
+        self.max_batch = max_batch
+        self.interval = interval
+        self.running = False
+        self.thread = None
+        self._batch = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def start(self):
+        """Start the flusher thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the flusher thread and deliver anything still buffered"""
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+        self.flush()
+
+    def emit(self, event: Dict):
+        """
+        Queue one event for the next batch
+
+        Args:
+            event: Normalized event dict
+        """
+        with self._lock:
+            self._batch.append(event)
+            full = len(self._batch) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Hand everything buffered so far to the batch callback"""
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if batch:
+            try:
+                self.batch_callback(batch)
+            except Exception as e:
+                print(f"[BatchEmitter] Error in batch callback: {e}")
+
+    def _flush_loop(self):
+        """Flush every interval, or early once a batch fills up"""
+        while self.running:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
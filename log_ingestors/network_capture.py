@@ -6,32 +6,79 @@ Detects port scans, SYN floods, and unusual network activity.
 """
 
 from scapy.all import sniff, IP, TCP, UDP, ICMP
-from collections import defaultdict
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime
 from typing import Dict, List, Optional
 import threading
 import time
 
+from log_ingestors.batch_emitter import BatchEmitter
+
+# Kernel-side capture filter (BPF, compiled by libpcap/Npcap): only the IPv4
+# TCP and UDP packets the detectors look at reach Python.
+CAPTURE_FILTER = "ip and (tcp or udp)"
+
+# Opt-in cheaper filter that passes only TCP packets with SYN set (plus UDP),
+# skipping a Python call per data packet on busy links. The trade-off: FIN,
+# NULL, Xmas and ACK stealth scans carry no SYN, so their probes never reach
+# port-scan detection; use it only when connect/SYN scans are all that matter.
+SYN_ONLY_CAPTURE_FILTER = "ip and (udp or tcp[tcpflags] & tcp-syn != 0)"
+
+# How long tracking entries live, in nanoseconds of time.monotonic_ns()
+CONNECTION_TIMEOUT_NS = 60 * 1_000_000_000
+SYN_TIMEOUT_NS = 10 * 1_000_000_000
+
+
+def _new_connection():
+    return {"count": 0, "ports": set()}
+
+
+def _new_syn_flow():
+    return {"count": 0}
+
 
 class NetworkCapture:
     """Capture and analyze network traffic for threats"""
     
-    def __init__(self, callback=None, interface=None):
+    def __init__(self, callback=None, interface=None, capture_filter=CAPTURE_FILTER, batch_callback=None,
+                 udp_sample_rate=1):
         """
         Initialize Network Capture
         
         Args:
             callback: Function to call with detected threats
             interface: Network interface to capture on (None = all)
+            capture_filter: BPF filter applied before packets reach Python
+                (None = capture everything; SYN_ONLY_CAPTURE_FILTER is cheaper
+                but misses FIN/NULL/Xmas/ACK scans)
+            batch_callback: Function to call with lists of detected threats,
+                used instead of callback
+            udp_sample_rate: Keep only 1 in this many UDP packets (a power
+                of two) when traffic is too heavy to look at all of it
         """
+        if udp_sample_rate < 1 or udp_sample_rate & (udp_sample_rate - 1):
+            raise ValueError(f"udp_sample_rate must be a power of two: {udp_sample_rate!r}")
         self.callback = callback
+        self.emitter = BatchEmitter(batch_callback) if batch_callback else None
         self.interface = interface
+        self.udp_sample_rate = udp_sample_rate
+        if udp_sample_rate > 1:
+            # Sample in the kernel on the low bits of the IP ID, which senders
+            # step per packet; SYNs are never sampled, so port scan and SYN
+            # flood detection still see every flow. UDP ports count towards
+            # the same per-host port sets, so sampled UDP scans need
+            # PORT_SCAN_THRESHOLD / udp_sample_rate ports to be spotted.
+            sample_filter = f"not (udp and ip[4:2] & {udp_sample_rate - 1} != 0)"
+            capture_filter = f"({capture_filter}) and {sample_filter}" if capture_filter else sample_filter
+        self.capture_filter = capture_filter
         self.running = False
         self.thread = None
         
-        # Track connections for pattern detection
-        self.connections = defaultdict(lambda: {"count": 0, "ports": set(), "last_seen": datetime.now()})
-        self.syn_packets = defaultdict(lambda: {"count": 0, "last_seen": datetime.now()})
+        # Track connections for pattern detection. Entries are kept in
+        # last_seen order (moved to the end when touched), so cleanup only
+        # has to look at the stale ones at the front.
+        self.connections = OrderedDict()
+        self.syn_packets = OrderedDict()
         
         # Thresholds
         self.PORT_SCAN_THRESHOLD = 10  # ports in 60 seconds
@@ -50,6 +97,8 @@ class NetworkCapture:
             return
         
         self.running = True
+        if self.emitter:
+            self.emitter.start()
         self.thread = threading.Thread(
             target=self._capture_loop,
             args=(packet_count, timeout),
@@ -63,6 +112,8 @@ class NetworkCapture:
         self.running = False
         if self.thread:
             self.thread.join(timeout=5)
+        if self.emitter:
+            self.emitter.stop()
         print("[NetworkCapture] Stopped")
     
     def _capture_loop(self, packet_count, timeout):
@@ -70,6 +121,7 @@ class NetworkCapture:
         try:
             sniff(
                 iface=self.interface,
+                filter=self.capture_filter,
                 prn=self._process_packet,
                 store=False,
                 count=packet_count,
@@ -120,74 +172,83 @@ class NetworkCapture:
         dst_port = tcp_layer.dport
         flags = tcp_layer.flags
         
-        # Track connections
-        conn_key = f"{src_ip}->{dst_ip}"
-        self.connections[conn_key]["count"] += 1
-        self.connections[conn_key]["ports"].add(dst_port)
-        self.connections[conn_key]["last_seen"] = datetime.now()
+        # Track connections, keyed by (source, destination) tuples rather
+        # than formatted strings
+        conn = self._touch(self.connections, (src_ip, dst_ip), _new_connection)
+        conn["count"] += 1
+        conn["ports"].add(dst_port)
         
         # Detect port scan (many different ports from same source)
-        if len(self.connections[conn_key]["ports"]) >= self.PORT_SCAN_THRESHOLD:
+        if len(conn["ports"]) >= self.PORT_SCAN_THRESHOLD:
             self._report_threat({
                 "type": "PORT_SCAN",
                 "severity": "HIGH",
                 "source_ip": src_ip,
                 "target_ip": dst_ip,
-                "ports_scanned": len(self.connections[conn_key]["ports"]),
-                "message": f"Port scan detected from {src_ip} to {dst_ip} ({len(self.connections[conn_key]['ports'])} ports)"
+                "ports_scanned": len(conn["ports"]),
+                "message": f"Port scan detected from {src_ip} to {dst_ip} ({len(conn['ports'])} ports)"
             })
             # Reset to avoid duplicate alerts
-            self.connections[conn_key]["ports"] = set()
+            conn["ports"] = set()
         
         # Detect SYN flood (many SYN packets)
         if flags & 0x02:  # SYN flag
-            syn_key = f"{src_ip}->{dst_ip}:{dst_port}"
-            self.syn_packets[syn_key]["count"] += 1
-            self.syn_packets[syn_key]["last_seen"] = datetime.now()
+            syn = self._touch(self.syn_packets, (src_ip, dst_ip, dst_port), _new_syn_flow)
+            syn["count"] += 1
             
-            if self.syn_packets[syn_key]["count"] >= self.SYN_FLOOD_THRESHOLD:
+            if syn["count"] >= self.SYN_FLOOD_THRESHOLD:
                 self._report_threat({
                     "type": "SYN_FLOOD",
                     "severity": "CRITICAL",
                     "source_ip": src_ip,
                     "target_ip": dst_ip,
                     "target_port": dst_port,
-                    "packet_count": self.syn_packets[syn_key]["count"],
-                    "message": f"SYN flood detected from {src_ip} to {dst_ip}:{dst_port} ({self.syn_packets[syn_key]['count']} packets)"
+                    "packet_count": syn["count"],
+                    "message": f"SYN flood detected from {src_ip} to {dst_ip}:{dst_port} ({syn['count']} packets)"
                 })
                 # Reset
-                self.syn_packets[syn_key]["count"] = 0
+                syn["count"] = 0
     
     def _process_udp(self, src_ip: str, dst_ip: str, udp_layer):
         """Process UDP packet"""
         dst_port = udp_layer.dport
         
         # Track for potential UDP flood
-        conn_key = f"{src_ip}->{dst_ip}"
-        self.connections[conn_key]["count"] += 1
-        self.connections[conn_key]["ports"].add(dst_port)
-        self.connections[conn_key]["last_seen"] = datetime.now()
+        conn = self._touch(self.connections, (src_ip, dst_ip), _new_connection)
+        conn["count"] += 1
+        conn["ports"].add(dst_port)
     
     def _process_icmp(self, src_ip: str, dst_ip: str, icmp_layer):
         """Process ICMP packet"""
         # Could detect ICMP floods or ping sweeps
         pass
     
+    def _touch(self, table: OrderedDict, key, new_entry) -> Dict:
+        """Return the tracking entry for key, created with new_entry() if missing, marked as just seen"""
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = new_entry()
+        else:
+            table.move_to_end(key)
+        # A monotonic int is far cheaper to take and compare than a datetime
+        entry["last_seen"] = time.monotonic_ns()
+        return entry
+    
     def _cleanup_old_entries(self):
         """Remove old tracking entries"""
-        now = datetime.now()
-        cutoff = now - timedelta(seconds=60)
+        now = time.monotonic_ns()
         
-        # Cleanup connections
-        to_remove = [k for k, v in self.connections.items() if v["last_seen"] < cutoff]
-        for k in to_remove:
-            del self.connections[k]
+        # Cleanup connections, oldest first, stopping at the first fresh one
+        cutoff = now - CONNECTION_TIMEOUT_NS
+        connections = self.connections
+        while connections and next(iter(connections.values()))["last_seen"] < cutoff:
+            connections.popitem(last=False)
         
         # Cleanup SYN packets
-        cutoff_syn = now - timedelta(seconds=10)
-        to_remove = [k for k, v in self.syn_packets.items() if v["last_seen"] < cutoff_syn]
-        for k in to_remove:
-            del self.syn_packets[k]
+        cutoff_syn = now - SYN_TIMEOUT_NS
+        syn_packets = self.syn_packets
+        while syn_packets and next(iter(syn_packets.values()))["last_seen"] < cutoff_syn:
+            syn_packets.popitem(last=False)
     
     def _report_threat(self, threat_data: Dict):
         """Report detected threat"""
@@ -201,16 +262,24 @@ class NetworkCapture:
             "raw_data": threat_data
         }
         
-        if self.callback:
-            self.callback(normalized)
+        if self.emitter or self.callback:
+            self._emit(normalized)
         else:
             print(f"\n[THREAT] {threat_data['message']}")
     
+    def _emit(self, normalized: Dict):
+        """Pass a normalized event to the batch emitter, or straight to the callback"""
+        if self.emitter:
+            self.emitter.emit(normalized)
+        elif self.callback:
+            self.callback(normalized)
+    
     def get_statistics(self) -> Dict:
         """Get capture statistics"""
         return {
             "active_connections": len(self.connections),
             "tracked_syn_flows": len(self.syn_packets),
+            "udp_sample_rate": self.udp_sample_rate,
             "total_ports_seen": sum(len(v["ports"]) for v in self.connections.values())
         }
 
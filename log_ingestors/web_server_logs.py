@@ -5,13 +5,36 @@ Parses Apache and Nginx logs for security threats.
 Detects SQL injection, XSS, path traversal, and scanner activity.
 """
 
+import os
 import re
 from datetime import datetime
 from typing import List, Dict, Optional
 from pathlib import Path
 import threading
+import queue
 import time
 
+from log_ingestors.batch_emitter import BatchEmitter
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+
+class _AppendedLinesHandler(FileSystemEventHandler):
+    """Hands modification events for watched log files to the parser"""
+    
+    def __init__(self, parser):
+        self.parser = parser
+    
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.parser.read_new_lines(event.src_path)
+
 
 class WebServerLogParser:
     """Parse Apache/Nginx logs for security threats"""
@@ -22,6 +45,9 @@ class WebServerLogParser:
     # Apache Combined Log Format (includes user agent and referer)
     COMBINED_LOG_PATTERN = r'(\S+) \S+ \S+ \[([\w:/]+\s[+\-]\d{4})\] "(\S+) (\S+) \S+" (\d{3}) (\S+) "([^"]*)" "([^"]*)"'
     
+    COMMON_LOG_RE = re.compile(COMMON_LOG_PATTERN)
+    COMBINED_LOG_RE = re.compile(COMBINED_LOG_PATTERN)
+    
     # Threat patterns
     SQL_INJECTION_PATTERNS = [
         r"union\s+select",
@@ -64,17 +90,44 @@ class WebServerLogParser:
         "openvas"
     ]
     
-    def __init__(self, callback=None):
+    # Each category's patterns compiled into a single alternation, so a
+    # clean path costs one search per category instead of one per pattern.
+    # The patterns are all lowercase and run against the lowercased path.
+    SQL_INJECTION_RE = re.compile("|".join(SQL_INJECTION_PATTERNS))
+    XSS_RE = re.compile("|".join(XSS_PATTERNS))
+    PATH_TRAVERSAL_RE = re.compile("|".join(PATH_TRAVERSAL_PATTERNS))
+    # Each pattern compiled on its own, for reporting which one matched
+    SQL_INJECTION_PATTERN_RES = [re.compile(p) for p in SQL_INJECTION_PATTERNS]
+    XSS_PATTERN_RES = [re.compile(p) for p in XSS_PATTERNS]
+    PATH_TRAVERSAL_PATTERN_RES = [re.compile(p) for p in PATH_TRAVERSAL_PATTERNS]
+    # All three categories in one alternation, to screen out clean paths
+    PATH_THREAT_RE = re.compile("|".join(SQL_INJECTION_PATTERNS + XSS_PATTERNS + PATH_TRAVERSAL_PATTERNS))
+    
+    # Lines read but not yet parsed; when the worker falls this far behind,
+    # new lines are dropped (and counted) rather than stalling the reader
+    LINE_QUEUE_SIZE = 10000
+    
+    def __init__(self, callback=None, batch_callback=None):
         """
         Initialize Web Server Log Parser
         
         Args:
             callback: Function to call with detected threats
+            batch_callback: Function to call with lists of normalized logs,
+                used instead of callback
         """
         self.callback = callback
+        self.emitter = BatchEmitter(batch_callback) if batch_callback else None
         self.running = False
         self.thread = None
+        self.observer = None
+        self.worker = None
         self.watched_files = []
+        self.dropped_lines = 0
+        self._lines = queue.Queue(maxsize=self.LINE_QUEUE_SIZE)
+        # Open watched files by normalized path: [file, partial last line]
+        self._tails = {}
+        self._lock = threading.Lock()
         
     def parse_line(self, line: str) -> Optional[Dict]:
         """
@@ -86,13 +139,14 @@ class WebServerLogParser:
         Returns:
             Parsed log dict or None
         """
-        # Try combined format first (more info)
-        match = re.match(self.COMBINED_LOG_PATTERN, line)
+        # Try combined format first (more info); it can only match lines
+        # with the six quotes around request, referer and user agent
+        match = self.COMBINED_LOG_RE.match(line) if line.count('"') >= 6 else None
         if match:
             ip, timestamp, method, path, status, size, referer, user_agent = match.groups()
         else:
             # Try common format
-            match = re.match(self.COMMON_LOG_PATTERN, line)
+            match = self.COMMON_LOG_RE.match(line)
             if match:
                 ip, timestamp, method, path, status, size = match.groups()
                 referer = ""
@@ -126,38 +180,35 @@ class WebServerLogParser:
         path = parsed_log["path"].lower()
         user_agent = parsed_log["user_agent"].lower()
         
-        # SQL Injection Detection
-        for pattern in self.SQL_INJECTION_PATTERNS:
-            if re.search(pattern, path, re.IGNORECASE):
+        # One search over the path with every pattern rules out the common
+        # clean request; only a hit goes on to the per-category checks
+        if self.PATH_THREAT_RE.search(path):
+            # SQL Injection Detection
+            if self.SQL_INJECTION_RE.search(path):
                 threats.append({
                     "type": "SQL_INJECTION",
                     "severity": "CRITICAL",
-                    "pattern": pattern,
+                    "pattern": self._first_match(self.SQL_INJECTION_PATTERN_RES, path),
                     "location": "path"
                 })
-                break
-        
-        # XSS Detection
-        for pattern in self.XSS_PATTERNS:
-            if re.search(pattern, path, re.IGNORECASE):
+            
+            # XSS Detection
+            if self.XSS_RE.search(path):
                 threats.append({
                     "type": "XSS",
                     "severity": "HIGH",
-                    "pattern": pattern,
+                    "pattern": self._first_match(self.XSS_PATTERN_RES, path),
                     "location": "path"
                 })
-                break
-        
-        # Path Traversal Detection
-        for pattern in self.PATH_TRAVERSAL_PATTERNS:
-            if re.search(pattern, path, re.IGNORECASE):
+            
+            # Path Traversal Detection
+            if self.PATH_TRAVERSAL_RE.search(path):
                 threats.append({
                     "type": "PATH_TRAVERSAL",
                     "severity": "HIGH",
-                    "pattern": pattern,
+                    "pattern": self._first_match(self.PATH_TRAVERSAL_PATTERN_RES, path),
                     "location": "path"
                 })
-                break
         
         # Scanner Detection
         for scanner in self.SCANNER_USER_AGENTS:
@@ -188,6 +239,17 @@ class WebServerLogParser:
         
         return threats
     
+    @staticmethod
+    def _first_match(patterns: List[re.Pattern], text: str) -> Optional[str]:
+        """
+        Return the first pattern in list order found in text; only called
+        once the category's combined regex has matched
+        """
+        for pattern in patterns:
+            if pattern.search(text):
+                return pattern.pattern
+        return None
+    
     def normalize_log(self, parsed_log: Dict, threats: List[Dict]) -> Dict:
         """
         Normalize log to standard format
@@ -239,38 +301,87 @@ class WebServerLogParser:
         
         threats = self.detect_threats(parsed)
         
-        # Only report if threats detected or callback wants all logs
-        if threats or self.callback:
-            normalized = self.normalize_log(parsed, threats)
-            if self.callback:
-                self.callback(normalized)
+        # Every parsed line is reported when there is someone to report to
+        if self.emitter or self.callback:
+            self._emit(self.normalize_log(parsed, threats))
     
-    def watch_file(self, filepath: str):
+    def _emit(self, normalized: Dict):
+        """Pass a normalized event to the batch emitter, or straight to the callback"""
+        if self.emitter:
+            self.emitter.emit(normalized)
+        elif self.callback:
+            self.callback(normalized)
+    
+    @staticmethod
+    def _file_key(filepath: str) -> str:
+        return os.path.normcase(os.path.abspath(filepath))
+    
+    def watch_file(self, filepath: str) -> bool:
         """
-        Watch a log file for new entries
+        Start following a log file from its current end
         
         Args:
             filepath: Path to log file
+            
+        Returns:
+            True if the file is now being watched
         """
         path = Path(filepath)
         if not path.exists():
             print(f"[WebServerLogParser] File not found: {filepath}")
-            return
+            return False
+        
+        # Skip existing content; only new entries are processed
+        f = open(filepath, 'r', encoding='utf-8', errors='ignore')
+        f.seek(0, 2)
+        with self._lock:
+            self._tails[self._file_key(filepath)] = [f, ""]
         
         self.watched_files.append(filepath)
         print(f"[WebServerLogParser] Watching {filepath}")
+        return True
+    
+    def read_new_lines(self, filepath: str):
+        """
+        Process everything appended to a watched file since the last read
         
-        # Read existing content first
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            # Skip to end
-            f.seek(0, 2)
-            
-            while self.running:
-                line = f.readline()
-                if line:
-                    self.process_log_line(line.strip())
-                else:
-                    time.sleep(0.5)
+        Args:
+            filepath: Path to log file
+        """
+        with self._lock:
+            tail = self._tails.get(self._file_key(filepath))
+            if tail is None or not self.running:
+                return
+            data = tail[0].read()
+            if not data:
+                return
+            lines = (tail[1] + data).split("\n")
+            # Keep a partially written last line until the rest arrives
+            tail[1] = lines.pop()
+        
+        # Parsing and threat detection happen on the worker thread, so
+        # reading keeps up with bursts
+        for line in lines:
+            try:
+                self._lines.put_nowait(line.strip())
+            except queue.Full:
+                self.dropped_lines += 1
+    
+    def _process_queued_lines(self):
+        """Worker loop: parse and check lines in the order they were read"""
+        while self.running:
+            try:
+                line = self._lines.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.process_log_line(line)
+    
+    def _poll_files(self):
+        """Fallback when watchdog is not installed: poll every file from one thread"""
+        while self.running:
+            for key in list(self._tails):
+                self.read_new_lines(key)
+            time.sleep(0.5)
     
     def start(self, log_files: List[str]):
         """
@@ -284,20 +395,50 @@ class WebServerLogParser:
             return
         
         self.running = True
+        if self.emitter:
+            self.emitter.start()
+        self._lines = queue.Queue(maxsize=self.LINE_QUEUE_SIZE)
+        self.worker = threading.Thread(target=self._process_queued_lines, daemon=True)
+        self.worker.start()
         
-        # Start a thread for each log file
+        directories = set()
         for log_file in log_files:
-            thread = threading.Thread(target=self.watch_file, args=(log_file,), daemon=True)
-            thread.start()
+            if self.watch_file(log_file):
+                directories.add(os.path.dirname(os.path.abspath(log_file)))
+        
+        if WATCHDOG_AVAILABLE:
+            # One observer thread for all files, woken by the OS on each write
+            # instead of a polling thread per file
+            self.observer = Observer()
+            handler = _AppendedLinesHandler(self)
+            for directory in directories:
+                self.observer.schedule(handler, directory, recursive=False)
+            self.observer.start()
+        else:
+            self.thread = threading.Thread(target=self._poll_files, daemon=True)
+            self.thread.start()
         
         print(f"[WebServerLogParser] Started watching {len(log_files)} log files")
     
     def stop(self):
         """Stop watching log files"""
         self.running = False
+        if self.observer:
+            self.observer.stop()
+            self.observer.join(timeout=5)
+            self.observer = None
+        if self.worker:
+            self.worker.join(timeout=5)
+            self.worker = None
+        if self.emitter:
+            self.emitter.stop()
+        with self._lock:
+            for f, _ in self._tails.values():
+                f.close()
+            self._tails.clear()
+        self.watched_files = []
         print("[WebServerLogParser] Stopped")
 
-
 # Test function
 if __name__ == "__main__":
     def print_threat(log):
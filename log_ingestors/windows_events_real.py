@@ -9,11 +9,28 @@ import win32evtlog
 import win32evtlogutil
 import win32con
 import xml.etree.ElementTree as ET
+import html
+import re
+from collections import namedtuple
 from datetime import datetime
 from typing import List, Dict, Optional
-import threading
 import time
 
+from log_ingestors.batch_emitter import BatchEmitter
+
+# Fields pulled straight out of the XML that EvtRender produces. Its layout
+# is fixed and element text never contains a raw "<", so this skips building
+# an element tree for every event.
+SYSTEM_FIELDS_RE = re.compile(
+    r'<EventID\b[^>]*>(\d+)</EventID>.*?<EventRecordID>(\d+)</EventRecordID>.*?<Computer>([^<]*)</Computer>',
+    re.S
+)
+EVENT_DATA_RE = re.compile(r'<Data[^>]*>([^<]*)')
+
+# The fields of a legacy event record that _normalize_event uses, filled in
+# from an event rendered by the Evt API
+RenderedEvent = namedtuple("RenderedEvent", "EventID StringInserts ComputerName RecordNumber")
+
 
 class WindowsEventIngestor:
     """Monitor Windows Event Viewer for security events"""
@@ -30,20 +47,23 @@ class WindowsEventIngestor:
         4634: "Account Logged Off"
     }
     
-    def __init__(self, callback=None):
+    def __init__(self, callback=None, batch_callback=None):
         """
         Initialize Windows Event Ingestor
         
         Args:
             callback: Function to call with normalized log data
+            batch_callback: Function to call with lists of normalized log
+                data, used instead of callback
         """
         self.callback = callback
+        self.emitter = BatchEmitter(batch_callback) if batch_callback else None
         self.running = False
-        self.thread = None
+        self.subscription = None
         self.server = 'localhost'
         self.logtype = 'Security'
-        self.hand = None
-        self.flags = win32evtlog.EVENTLOG_BACKWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
+        # Only the monitored event IDs are delivered; Windows does the filtering
+        self.query = "*[System[(" + " or ".join(f"EventID={event_id}" for event_id in self.EVENT_IDS) + ")]]"
         
     def start(self):
         """Start monitoring Windows Event Log"""
@@ -51,50 +71,74 @@ class WindowsEventIngestor:
             print("[WindowsEventIngestor] Already running")
             return
             
+        try:
+            # Windows pushes each new matching event to _on_event as it is
+            # logged, so nothing polls and nothing is read just to be skipped
+            self.subscription = win32evtlog.EvtSubscribe(
+                self.logtype,
+                win32evtlog.EvtSubscribeToFutureEvents,
+                Callback=self._on_event,
+                Query=self.query
+            )
+        except Exception as e:
+            print(f"[WindowsEventIngestor] Error: {e}")
+            return
+        
         self.running = True
-        self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self.thread.start()
+        if self.emitter:
+            self.emitter.start()
         print(f"[WindowsEventIngestor] Started monitoring {self.logtype} event log")
         
     def stop(self):
         """Stop monitoring"""
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=5)
-        if self.hand:
-            win32evtlog.CloseEventLog(self.hand)
+        if self.subscription:
+            self.subscription.Close()
+            self.subscription = None
+        if self.emitter:
+            self.emitter.stop()
         print("[WindowsEventIngestor] Stopped")
         
-    def _monitor_loop(self):
-        """Main monitoring loop"""
+    def _on_event(self, action, context, event_handle):
+        """EvtSubscribe callback, called on a Windows thread pool thread"""
+        if action != win32evtlog.EvtSubscribeActionDeliver or not self.running:
+            return
         try:
-            self.hand = win32evtlog.OpenEventLog(self.server, self.logtype)
-            last_record = win32evtlog.GetNumberOfEventLogRecords(self.hand)
-            
-            while self.running:
-                # Read new events
-                events = win32evtlog.ReadEventLog(
-                    self.hand,
-                    self.flags,
-                    0
-                )
-                
-                if events:
-                    for event in events:
-                        # Only process events we care about
-                        if event.EventID in self.EVENT_IDS:
-                            normalized = self._normalize_event(event)
-                            if normalized and self.callback:
-                                self.callback(normalized)
-                
-                # Sleep to avoid excessive CPU usage
-                time.sleep(2)
-                
+            event = self._parse_event_xml(
+                win32evtlog.EvtRender(event_handle, win32evtlog.EvtRenderEventXml)
+            )
+            normalized = self._normalize_event(event)
+            if normalized:
+                self._emit(normalized)
         except Exception as e:
             print(f"[WindowsEventIngestor] Error: {e}")
-        finally:
-            if self.hand:
-                win32evtlog.CloseEventLog(self.hand)
+    
+    def _emit(self, normalized: Dict):
+        """Pass a normalized event to the batch emitter, or straight to the callback"""
+        if self.emitter:
+            self.emitter.emit(normalized)
+        elif self.callback:
+            self.callback(normalized)
+    
+    @staticmethod
+    def _parse_event_xml(xml: str) -> RenderedEvent:
+        """Pull the fields _normalize_event needs out of a rendered event"""
+        event_id, record_number, computer = SYSTEM_FIELDS_RE.search(xml).groups()
+        event_data = xml.find("<EventData")
+        # The EventData values, in order, are the legacy string inserts;
+        # empty and self-closing <Data> elements read as None
+        strings = []
+        if event_data != -1:
+            for value in EVENT_DATA_RE.findall(xml, event_data):
+                if "&" in value:
+                    value = html.unescape(value)
+                strings.append(value or None)
+        return RenderedEvent(
+            EventID=int(event_id),
+            StringInserts=strings,
+            ComputerName=html.unescape(computer),
+            RecordNumber=int(record_number)
+        )
                 
     def _normalize_event(self, event) -> Optional[Dict]:
         """
@@ -4,4 +4,8 @@ if __name__ == "__main__":
     import uvicorn
     import os
     port = int(os.getenv("PORT", 8081))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Dashboard state and websocket connections live in process memory, so
+    # each extra worker keeps its own copy; only raise WORKERS if that's fine.
+    # uvicorn uses uvloop and httptools automatically when they are installed.
+    workers = int(os.getenv("WORKERS", 1))
+    uvicorn.run("api.main:app", host="0.0.0.0", port=port, workers=workers)
@@ -23,19 +23,25 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="CyberGuard AI Runner")
     parser.add_argument("--host", default="0.0.0.0", help="Host address (default: 0.0.0.0)")
     parser.add_argument("--port", type=int, default=8081, help="Port number (default: 8081)")
+    parser.add_argument("--dev", action="store_true", help="Reload on code changes (development only)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes (default: 1; each keeps its own dashboard state)")
     args = parser.parse_args()
 
     print(BANNER)
     print(f"[*] Initializing Neural Defense Agents...")
     print(f"[*] Dashboard Access: http://{args.host}:{args.port}/dashboard")
     
-    # Set PORT environment variable so api.auto_logs can pick it up
-    os.environ["PORT"] = str(args.port)
-    
     print(f"[*] Press Ctrl+C to stop the system\n")
 
     try:
-        uvicorn.run("api.main:app", host=args.host, port=args.port, reload=True)
+        if args.dev:
+            uvicorn.run("api.main:app", host=args.host, port=args.port, reload=True)
+        else:
+            # No reloader process watching the tree; uvicorn picks uvloop and
+            # httptools itself when they are installed (uvloop isn't on Windows)
+            uvicorn.run("api.main:app", host=args.host, port=args.port, workers=args.workers,
+                        loop="auto", http="auto", log_level="warning")
     except KeyboardInterrupt:
         print("\n\033[93m[!] System shutdown requested. Safely terminating agents...\033[0m")
     except Exception as e:
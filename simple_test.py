@@ -5,6 +5,8 @@ Tests Web Server Log Parser directly
 
 import sys
 import os
+from collections import Counter
+from itertools import chain
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -39,26 +41,25 @@ if os.path.exists(log_file):
     print(f"Reading: {log_file}")
     print()
     
-    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
-    
-    print(f"Processing {len(lines)} log entries...\n")
+    print("Processing log entries...\n")
     
-    for line in lines:
-        if line.strip():
-            parser.process_log_line(line.strip())
+    # Stream the file line by line instead of loading it all into a list
+    line_count = 0
+    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line_count += 1
+            line = line.strip()
+            if line:
+                parser.process_log_line(line)
     
     print("=" * 80)
-    print(f"RESULT: Found {len(threats_found)} threats in {len(lines)} log entries")
+    print(f"RESULT: Found {len(threats_found)} threats in {line_count} log entries")
     print("=" * 80)
     print()
     
     if threats_found:
         print("Threat Summary:")
-        threat_types = {}
-        for t in threats_found:
-            for threat in t.get('threats', []):
-                threat_types[threat] = threat_types.get(threat, 0) + 1
+        threat_types = Counter(chain.from_iterable(t.get('threats', []) for t in threats_found))
         
         for threat_type, count in sorted(threat_types.items()):
             print(f"  {threat_type}: {count}")
@@ -11,11 +11,23 @@ Run this to verify the backend is 100% functional!
 import sys
 import os
 import time
+from collections import Counter
 from datetime import datetime
+from itertools import chain
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Console color per severity, shared by the callbacks below
+SEVERITY_COLORS = {
+    'CRITICAL': '\033[91m',  # Red
+    'HIGH': '\033[93m',      # Yellow
+    'MEDIUM': '\033[94m',    # Blue
+    'LOW': '\033[92m',       # Green
+    'INFO': '\033[0m',
+}
+RESET = '\033[0m'
+
 print("=" * 80)
 print("  CyberGuard AI - Log Source Verification Test")
 print("=" * 80)
@@ -36,18 +48,9 @@ try:
         severity = log_data.get('severity', 'UNKNOWN')
         source_ip = log_data.get('source_ip', 'unknown')
         threats = log_data.get('threats', [])
+        color = SEVERITY_COLORS.get(severity, RESET)
         
-        # Color coding
-        colors = {
-            'CRITICAL': '\033[91m',  # Red
-            'HIGH': '\033[93m',      # Yellow
-            'MEDIUM': '\033[94m',    # Blue
-            'LOW': '\033[92m',       # Green
-        }
-        color = colors.get(severity, '\033[0m')
-        reset = '\033[0m'
-        
-        print(f"{color}[{severity}]{reset} Threat from {source_ip}: {', '.join(threats)}")
+        print(f"{color}[{severity}]{RESET} Threat from {source_ip}: {', '.join(threats)}")
         print(f"         Message: {log_data.get('message', '')}")
     
     # Create parser
@@ -58,27 +61,26 @@ try:
     if os.path.exists(log_file):
         print(f"✅ Found log file: {log_file}")
         
-        # Read and parse all lines
+        # Stream and parse all lines without loading the whole file
+        line_count = 0
         with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-            print(f"📄 Processing {len(lines)} log entries...")
+            print("📄 Processing log entries...")
             print()
             
-            for line in lines:
-                if line.strip():
-                    parser.process_log_line(line.strip())
+            for line in f:
+                line_count += 1
+                line = line.strip()
+                if line:
+                    parser.process_log_line(line)
         
         print()
-        print(f"✅ TEST 1 PASSED: Detected {len(threats_detected)} threats from {len(lines)} log entries")
+        print(f"✅ TEST 1 PASSED: Detected {len(threats_detected)} threats from {line_count} log entries")
         print()
         
         # Show summary
         if threats_detected:
             print("Threat Summary:")
-            threat_types = {}
-            for t in threats_detected:
-                for threat_type in t.get('threats', []):
-                    threat_types[threat_type] = threat_types.get(threat_type, 0) + 1
+            threat_types = Counter(chain.from_iterable(t.get('threats', []) for t in threats_detected))
             
             for threat_type, count in threat_types.items():
                 print(f"  - {threat_type}: {count} detected")
@@ -130,18 +132,9 @@ try:
         severity = event_data.get('severity', 'INFO')
         username = event_data.get('username', 'Unknown')
         source_ip = event_data.get('source_ip', 'Unknown')
+        color = SEVERITY_COLORS.get(severity, RESET)
         
-        # Color coding
-        colors = {
-            'HIGH': '\033[93m',
-            'MEDIUM': '\033[94m',
-            'LOW': '\033[92m',
-            'INFO': '\033[0m',
-        }
-        color = colors.get(severity, '\033[0m')
-        reset = '\033[0m'
-        
-        print(f"{color}[{severity}]{reset} {event_type}: User={username}, IP={source_ip}")
+        print(f"{color}[{severity}]{RESET} {event_type}: User={username}, IP={source_ip}")
     
     # Create ingestor
     ingestor = WindowsEventIngestor(callback=on_event_captured)